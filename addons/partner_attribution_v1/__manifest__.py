@@ -16,6 +16,8 @@
         "auth_signup",
         "sale_crm",
         "crm",
+        "phone_validation",
+        "sms",
     ],
     "data": [
         # Security (order matters)
@@ -35,6 +37,9 @@
         "views/account_move_views.xml",
         "views/attribution_search_views.xml",
         "views/payout_batch_views.xml",
+        "views/commission_rule_views.xml",
+        "views/commission_forecast_views.xml",
+        "views/commission_report_views.xml",
 
         # MUST be before menus.xml
         "views/partner_attribution_ledger_views.xml",
@@ -45,6 +50,9 @@
         "views/partner_contract_report.xml",
 
         "views/partner_inquiry_views.xml",
+        "views/partner_import_validation_views.xml",
+        "views/ledger_export_views.xml",
+        "views/event_outbox_views.xml",
 
         # Website/portal
         "views/website_partner_pages.xml",
@@ -53,6 +61,11 @@
         # Menus last
         "views/menus.xml",
     ],
+    "assets": {
+        "web.assets_frontend": [
+            "partner_attribution_v1/static/src/js/portal_partner_sections.js",
+        ],
+    },
     "post_init_hook": "post_init_hook",
     "installable": True,
     "application": False,
@@ -1,2 +1,3 @@
 from . import partner_portal
-from . import partner_website
\ No newline at end of file
+from . import partner_website
+from . import ledger_export
\ No newline at end of file
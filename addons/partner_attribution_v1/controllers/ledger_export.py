@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+from odoo import fields, http
+from odoo.http import request
+
+from ..models.ledger_export import _iter_export, _ledger_export_query
+
+
+def _export_filters(kwargs):
+    """(date_from, date_to, state) from query args; invalid values are ignored."""
+    dates = []
+    for key in ("date_from", "date_to"):
+        try:
+            dates.append(fields.Date.to_date(kwargs.get(key) or None))
+        except ValueError:
+            dates.append(None)
+    return dates[0], dates[1], (kwargs.get("state") or "").strip() or None
+
+
+def _export_response(query, params, file_format, basename):
+    if file_format == "xlsx":
+        mimetype = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    else:
+        file_format, mimetype = "csv", "text/csv; charset=utf-8"
+    # the body is a generator over a server-side cursor: constant memory, any row count
+    body = _iter_export(request.env.registry, query, params, file_format)
+    return request.make_response(body, headers=[
+        ("Content-Type", mimetype),
+        ("Content-Disposition", 'attachment; filename="%s.%s"' % (basename, file_format)),
+        ("Cache-Control", "no-store"),
+        ("X-Accel-Buffering", "no"),
+    ])
+
+
+class PartnerLedgerExportController(http.Controller):
+
+    @http.route(
+        ["/partners/portal/ledger/export.csv", "/partners/portal/ledger/export.xlsx"],
+        type="http", auth="user", methods=["GET"], sitemap=False,
+    )
+    def partners_portal_ledger_export(self, **kwargs):
+        partner = request.env.user.partner_id
+        commercial = partner.commercial_partner_id or partner
+        date_from, date_to, state = _export_filters(kwargs)
+
+        # raw cursor: scope to the partner's own ledger (same column as the portal record rule)
+        query, params = _ledger_export_query(
+            "l.attributed_commercial_partner_id = %s", [commercial.id],
+            date_from=date_from, date_to=date_to, state=state,
+        )
+        file_format = "xlsx" if request.httprequest.path.endswith(".xlsx") else "csv"
+        return _export_response(query, params, file_format, "commission-ledger")
+
+    @http.route("/partner_attribution/ledger/export", type="http", auth="user", methods=["GET"], sitemap=False)
+    def backend_ledger_export(self, **kwargs):
+        user = request.env.user
+        if not user.has_group("partner_attribution_v1.group_partner_attr_officer"):
+            return request.not_found()
+        date_from, date_to, state = _export_filters(kwargs)
+
+        # raw cursor: scope to the companies the user may access
+        query, params = _ledger_export_query(
+            "l.company_id = ANY(%s)", [user.company_ids.ids],
+            date_from=date_from, date_to=date_to, state=state,
+        )
+        return _export_response(query, params, kwargs.get("format"), "partner-ledger")
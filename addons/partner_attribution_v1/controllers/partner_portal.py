@@ -1,12 +1,15 @@
 # -*- coding: utf-8 -*-
-import base64
+import hashlib
 import os
 import re
 import secrets
 
-from odoo import http
+from odoo import fields, http
+from odoo.exceptions import UserError
 from odoo.http import request
 
+from ..models.res_partner import _normalize_email, _normalize_phone
+
 ROLE_MAP = {
     "ap": {"name": "Affiliate Partner"},
     "lead": {"name": "Lead Partner"},
@@ -14,6 +17,19 @@ ROLE_MAP = {
     "sales_partner": {"name": "Sales Partner (Buy–Sell)"},
 }
 
+# multipart boundaries + headers + csrf_token field around the uploaded file
+UPLOAD_FORM_OVERHEAD = 64 * 1024
+
+# lazy dashboard sections shown per role (each one is a JSON route under /partners/portal/)
+PORTAL_SECTIONS_BY_ROLE = {
+    "ap": ("ledger", "orders", "invoices", "documents"),
+    "lead": ("ledger", "leads", "documents"),
+    "sales_agent": ("ledger", "orders", "documents"),
+    "sales_partner": ("ledger", "orders", "documents"),
+}
+SECTION_PAGE_SIZE = 20
+SECTION_MAX_PAGE_SIZE = 100
+
 
 def _safe_filename(name: str) -> str:
     """Prevent weird filenames / header injection / path tricks."""
@@ -27,6 +43,73 @@ def _safe_filename(name: str) -> str:
 
 class PartnerPortalController(http.Controller):
 
+    # -------------------------
+    # Helpers
+    # -------------------------
+    def _pa_v1_portal_scope(self):
+        """(partner, commercial partner, [own id, commercial id], role) of the logged-in portal user."""
+        partner = request.env.user.partner_id
+        commercial = partner.commercial_partner_id or partner
+        partner_ids = [partner.id]
+        if commercial.id != partner.id:
+            partner_ids.append(commercial.id)
+        return partner, commercial, partner_ids, getattr(partner, "partner_role", False)
+
+    def _pa_v1_keyset_page(self, Model, domain, after=None, limit=None):
+        """
+        One page of `Model` records, newest first, using the id as keyset cursor
+        (no OFFSET scans). Returns (records, next_cursor or None).
+        """
+        try:
+            limit = min(max(int(limit or SECTION_PAGE_SIZE), 1), SECTION_MAX_PAGE_SIZE)
+        except (TypeError, ValueError):
+            limit = SECTION_PAGE_SIZE
+        domain = list(domain)
+        try:
+            if after:
+                domain.append(("id", "<", int(after)))
+        except (TypeError, ValueError):
+            pass
+        # one extra row tells whether another page exists
+        records = Model.search(domain, order="id desc", limit=limit + 1)
+        next_cursor = records[limit - 1].id if len(records) > limit else None
+        return records[:limit], next_cursor
+
+    def _pa_v1_section_response(self, rows, next_cursor):
+        return request.make_json_response({"records": rows, "next": next_cursor})
+
+    def _pa_v1_dashboard_etag(self, partner, commercial, partner_ids, forecast_amount, pricelist):
+        """
+        Validator for the dashboard shell: changes whenever the partner, their ledger,
+        attributed orders or documents change (latest write_date + count of each),
+        the pipeline forecast or pricelist shown change, or when the session
+        (CSRF token in the page) or language changes.
+        """
+        parts = [
+            request.env.uid,
+            request.session.sid,
+            request.env.lang,
+            partner.write_date,
+            commercial.write_date,
+            forecast_amount,
+            pricelist.id if pricelist else None,
+            pricelist.sudo().write_date if pricelist else None,
+        ]
+        scopes = (
+            ("partner.attribution.ledger", [("attributed_commercial_partner_id", "=", commercial.id)]),
+            ("sale.order", [("attributed_commercial_partner_id", "=", commercial.id)]),
+            ("ir.attachment", [("res_model", "=", "res.partner"), ("res_id", "in", partner_ids)]),
+        )
+        for model, domain in scopes:
+            if model in request.env:
+                parts.extend(request.env[model]._read_group(domain, aggregates=["write_date:max", "__count"])[0])
+        view = request.env.ref("partner_attribution_v1.portal_partner_dashboard", raise_if_not_found=False)
+        parts.append(view.sudo().write_date if view else None)
+        return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+    # -------------------------
+    # Dashboard shell: partner data + aggregated totals only
+    # -------------------------
     @http.route("/partners/portal", type="http", auth="user", website=True, sitemap=False)
     def partners_portal(self, **kwargs):
         # IMPORTANT: no sudo() so record rules apply
@@ -34,45 +117,40 @@ class PartnerPortalController(http.Controller):
         if not partner:
             return request.redirect("/web/login")
 
-        commercial = partner.commercial_partner_id or partner
-        partner_ids = [partner.id]
-        if commercial.id != partner.id:
-            partner_ids.append(commercial.id)
-
-        role = getattr(partner, "partner_role", False)
+        partner, commercial, partner_ids, role = self._pa_v1_portal_scope()
         role_label = ROLE_MAP.get(role, {}).get("name", "")
 
         # -------------------------
-        # Ledger (record rules apply)
+        # Pipeline forecast (open sale orders)
         # -------------------------
-        if "partner.attribution.ledger" in request.env:
-            Ledger = request.env["partner.attribution.ledger"]
-            # ✅ match your record rule: own OR commercial partner
-            lines = Ledger.search([("partner_id", "in", partner_ids)])
-        else:
-            lines = request.env["partner.attribution.ledger"].browse([])
+        forecast_amount = 0.0
+        if "partner.attribution.commission.forecast" in request.env:
+            forecast_amount = request.env["partner.attribution.commission.forecast"]._get_portal_forecast(partner_ids)
 
-        ledger_lines = lines.sorted(lambda x: x.id, reverse=True)[:50]
+        # -------------------------
+        # Pricelist (sales_partner)
+        # -------------------------
+        pricelist = partner.property_product_pricelist if role == "sales_partner" else False
 
-        payable_amount = sum(lines.filtered(lambda l: l.state == "payable").mapped("commission_amount"))
-        paid_amount = sum(lines.filtered(lambda l: l.state == "paid").mapped("commission_amount"))
-        on_hold_amount = sum(lines.filtered(lambda l: l.state == "on_hold").mapped("commission_amount"))
+        # conditional GET: unchanged dashboard -> 304 without rendering
+        etag = self._pa_v1_dashboard_etag(partner, commercial, partner_ids, forecast_amount, pricelist)
+        cache_headers = [("ETag", '"%s"' % etag), ("Cache-Control", "private, no-cache")]
+        if request.httprequest.if_none_match.contains(etag):
+            return request.make_response(b"", headers=cache_headers, status=304)
 
         # -------------------------
-        # Documents (record rules apply)
+        # Ledger totals (one grouped query, record rules apply)
         # -------------------------
-        if "ir.attachment" in request.env:
-            Attachment = request.env["ir.attachment"]
-            partner_docs = Attachment.search(
-                [
-                    ("res_model", "=", "res.partner"),
-                    ("res_id", "in", partner_ids),
-                ],
-                order="id desc",
-                limit=50,
-            )
-        else:
-            partner_docs = request.env["ir.attachment"].browse([])
+        totals = {}
+        ledger_count = 0
+        if "partner.attribution.ledger" in request.env:
+            for state, count, amount in request.env["partner.attribution.ledger"]._read_group(
+                [("attributed_commercial_partner_id", "=", commercial.id)],
+                groupby=["state"],
+                aggregates=["__count", "commission_amount:sum"],
+            ):
+                totals[state] = amount or 0.0
+                ledger_count += count
 
         # -------------------------
         # Referral link (sudo OK only for system param)
@@ -82,75 +160,122 @@ class PartnerPortalController(http.Controller):
         if getattr(partner, "partner_code", False):
             referral_url = "%s/r/%s" % (base_url, partner.partner_code)
 
-        # -------------------------
-        # Leads (lead role)
-        # -------------------------
-        lead_records = request.env["crm.lead"].browse([])
-        if role == "lead" and "crm.lead" in request.env:
-            Lead = request.env["crm.lead"]
-            lead_records = Lead.search(
-                [("partner_id", "=", commercial.id)],
-                order="id desc",
-                limit=50,
-            )
-
-        # -------------------------
-        # Sale Orders (sales_agent / ap / sales_partner)
-        # -------------------------
-        so_records = request.env["sale.order"].browse([])
-        if role in ("sales_agent", "ap", "sales_partner") and "sale.order" in request.env:
-            SO = request.env["sale.order"]
-            if "attributed_partner_id" in SO._fields:
-                # ✅ align with record rule (id or commercial)
-                so_records = SO.search(
-                    [("attributed_partner_id", "in", partner_ids)],
-                    order="id desc",
-                    limit=50,
-                )
-
-        # -------------------------
-        # Invoices (affiliate summary)
-        # -------------------------
-        inv_records = request.env["account.move"].browse([])
-        if role == "ap" and "account.move" in request.env:
-            Move = request.env["account.move"]
-            if "attributed_partner_id" in Move._fields:
-                # ✅ align with record rule (id or commercial)
-                inv_records = Move.search(
-                    [
-                        ("move_type", "in", ("out_invoice", "out_refund")),
-                        ("state", "=", "posted"),
-                        ("attributed_partner_id", "in", partner_ids),
-                    ],
-                    order="id desc",
-                    limit=50,
-                )
-
-        # -------------------------
-        # Pricelist (sales_partner)
-        # -------------------------
-        pricelist = partner.property_product_pricelist if role == "sales_partner" else False
-
-        return request.render("partner_attribution_v1.portal_partner_dashboard", {
+        # lists (ledger, documents, leads, orders, invoices) are loaded on demand by section
+        return request.render("partner_attribution_v1.portal_partner_dashboard", headers=cache_headers, qcontext={
             "partner": partner,
             "role": role,
             "role_label": role_label,
 
-            "ledger_count": len(lines),
-            "payable_amount": payable_amount,
-            "paid_amount": paid_amount,
-            "on_hold_amount": on_hold_amount,
-            "ledger_lines": ledger_lines,
-
-            "partner_docs": partner_docs,
+            "ledger_count": ledger_count,
+            "payable_amount": totals.get("payable", 0.0),
+            "paid_amount": totals.get("paid", 0.0),
+            "on_hold_amount": totals.get("on_hold", 0.0),
+            "forecast_amount": forecast_amount,
 
             "referral_url": referral_url,
-            "lead_records": lead_records,
-            "so_records": so_records,
-            "inv_records": inv_records,
             "pricelist": pricelist,
+            "sections": PORTAL_SECTIONS_BY_ROLE.get(role, ("ledger", "documents")),
         })
 
+    # -------------------------
+    # Dashboard sections (JSON, keyset pagination: ?after=<last id>&limit=<n>)
+    # -------------------------
+    @http.route("/partners/portal/ledger", type="http", auth="user", methods=["GET"], sitemap=False)
+    def partners_portal_ledger(self, after=None, limit=None, **kwargs):
+        _partner, commercial, _partner_ids, _role = self._pa_v1_portal_scope()
+        lines, next_cursor = self._pa_v1_keyset_page(
+            request.env["partner.attribution.ledger"],
+            [("attributed_commercial_partner_id", "=", commercial.id)],
+            after, limit,
+        )
+        return self._pa_v1_section_response([{
+            "id": l.id,
+            "reference": l.invoice_id.name or "",
+            "type": l.entry_type,
+            "state": l.state,
+            "amount": l.commission_amount,
+            "currency": l.currency_id.symbol or "",
+            "date": fields.Date.to_string(l.invoice_id.invoice_date) or "",
+        } for l in lines], next_cursor)
+
+    @http.route("/partners/portal/orders", type="http", auth="user", methods=["GET"], sitemap=False)
+    def partners_portal_orders(self, after=None, limit=None, **kwargs):
+        _partner, commercial, _partner_ids, role = self._pa_v1_portal_scope()
+        if "orders" not in PORTAL_SECTIONS_BY_ROLE.get(role, ()):
+            return self._pa_v1_section_response([], None)
+        orders, next_cursor = self._pa_v1_keyset_page(
+            request.env["sale.order"],
+            [("attributed_commercial_partner_id", "=", commercial.id)],
+            after, limit,
+        )
+        return self._pa_v1_section_response([{
+            "id": o.id,
+            "reference": o.name,
+            "date": fields.Datetime.to_string(o.date_order) or "",
+            "state": o.state,
+            "amount": o.amount_untaxed,
+            "currency": o.currency_id.symbol or "",
+        } for o in orders], next_cursor)
+
+    @http.route("/partners/portal/invoices", type="http", auth="user", methods=["GET"], sitemap=False)
+    def partners_portal_invoices(self, after=None, limit=None, **kwargs):
+        _partner, commercial, _partner_ids, role = self._pa_v1_portal_scope()
+        if "invoices" not in PORTAL_SECTIONS_BY_ROLE.get(role, ()):
+            return self._pa_v1_section_response([], None)
+        moves, next_cursor = self._pa_v1_keyset_page(
+            request.env["account.move"],
+            [
+                ("attributed_commercial_partner_id", "=", commercial.id),
+                ("move_type", "in", ("out_invoice", "out_refund")),
+                ("state", "=", "posted"),
+            ],
+            after, limit,
+        )
+        return self._pa_v1_section_response([{
+            "id": m.id,
+            "reference": m.name,
+            "date": fields.Date.to_string(m.invoice_date) or "",
+            "state": m.payment_state,
+            "amount": m.amount_untaxed_signed,
+            "currency": m.company_currency_id.symbol or "",
+        } for m in moves], next_cursor)
+
+    @http.route("/partners/portal/leads", type="http", auth="user", methods=["GET"], sitemap=False)
+    def partners_portal_leads(self, after=None, limit=None, **kwargs):
+        _partner, commercial, _partner_ids, role = self._pa_v1_portal_scope()
+        if "leads" not in PORTAL_SECTIONS_BY_ROLE.get(role, ()) or "crm.lead" not in request.env:
+            return self._pa_v1_section_response([], None)
+        leads, next_cursor = self._pa_v1_keyset_page(
+            request.env["crm.lead"],
+            [("partner_id", "=", commercial.id)],
+            after, limit,
+        )
+        return self._pa_v1_section_response([{
+            "id": l.id,
+            "reference": l.name,
+            "date": fields.Datetime.to_string(l.create_date) or "",
+            # portal users have no ACL on crm.stage; the lead itself is already scoped by the search
+            "state": l.sudo().stage_id.name or "",
+        } for l in leads], next_cursor)
+
+    @http.route("/partners/portal/documents", type="http", auth="user", methods=["GET"], sitemap=False)
+    def partners_portal_documents(self, after=None, limit=None, **kwargs):
+        _partner, _commercial, partner_ids, _role = self._pa_v1_portal_scope()
+        docs, next_cursor = self._pa_v1_keyset_page(
+            request.env["ir.attachment"],
+            [("res_model", "=", "res.partner"), ("res_id", "in", partner_ids)],
+            after, limit,
+        )
+        return self._pa_v1_section_response([{
+            "id": d.id,
+            "reference": d.name or ("Attachment %s" % d.id),
+            "date": fields.Datetime.to_string(d.create_date) or "",
+            # portal-safe download link: access_token when available
+            "url": "/web/content/%s?download=true%s" % (
+                d.id, ("&access_token=%s" % d.access_token) if d.access_token else ""
+            ),
+        } for d in docs], next_cursor)
+
     @http.route("/partners/portal/profile/submit", type="http", auth="user", website=True, methods=["POST"], csrf=True)
     def partners_portal_profile_submit(self, **post):
         partner = request.env.user.partner_id
@@ -173,17 +298,19 @@ class PartnerPortalController(http.Controller):
         if not partner:
             return request.redirect("/web/login")
 
+        # safety limit
+        max_bytes = 10 * 1024 * 1024  # 10MB
+
+        # reject oversized requests before werkzeug parses the multipart body
+        content_length = request.httprequest.content_length
+        if content_length and content_length > max_bytes + UPLOAD_FORM_OVERHEAD:
+            return request.redirect("/partners/portal")
+
         upload = request.httprequest.files.get("document")
         if not upload:
             return request.redirect("/partners/portal")
 
-        raw = upload.read() or b""
-        if not raw:
-            return request.redirect("/partners/portal")
-
-        # safety limit
-        max_bytes = 10 * 1024 * 1024  # 10MB
-        if len(raw) > max_bytes:
+        if upload.content_length and upload.content_length > max_bytes:
             return request.redirect("/partners/portal")
 
         allowed_mimes = {
@@ -210,8 +337,6 @@ class PartnerPortalController(http.Controller):
 
         attachment_vals = {
             "name": filename,
-            "type": "binary",
-            "datas": base64.b64encode(raw),
             "mimetype": mimetype or "application/octet-stream",
             "res_model": "res.partner",
             "res_id": owner_partner.id,
@@ -219,7 +344,13 @@ class PartnerPortalController(http.Controller):
             "public": False,
         }
 
-        att = request.env["ir.attachment"].sudo().create(attachment_vals)
+        # streamed to the filestore in chunks; identical re-uploads reuse the existing blob
+        try:
+            att = request.env["ir.attachment"].sudo()._pa_v1_create_from_stream(
+                upload.stream, max_bytes, attachment_vals
+            )
+        except UserError:
+            return request.redirect("/partners/portal")
 
         # Ensure access token exists (portal-safe /web/content links)
         if hasattr(att, "_ensure_access_token"):
@@ -245,13 +376,32 @@ class PartnerPortalController(http.Controller):
             return request.redirect("/partners/portal")
 
         commercial = partner.commercial_partner_id or partner
-
-        request.env["crm.lead"].create({
+        Lead = request.env["crm.lead"]
+
+        email_from = (post.get("email_from") or "").strip() or False
+        phone = (post.get("phone") or "").strip() or False
+
+        # skip leads this partner already submitted for the same contact
+        # (crm.lead's indexed email_normalized / phone_sanitized)
+        dedupe_email = _normalize_email(email_from)
+        dedupe_phone = _normalize_phone(request.env, phone)
+        if dedupe_email or dedupe_phone:
+            contact_domain = []
+            if dedupe_email and dedupe_phone:
+                contact_domain = ["|", ("email_normalized", "=", dedupe_email), ("phone_sanitized", "=", dedupe_phone)]
+            elif dedupe_email:
+                contact_domain = [("email_normalized", "=", dedupe_email)]
+            else:
+                contact_domain = [("phone_sanitized", "=", dedupe_phone)]
+            if Lead.search_count([("partner_id", "=", commercial.id)] + contact_domain, limit=1):
+                return request.redirect("/partners/portal")
+
+        Lead.create({
             "name": name,
             "partner_id": commercial.id,
             "contact_name": (post.get("contact_name") or "").strip() or False,
-            "email_from": (post.get("email_from") or "").strip() or False,
-            "phone": (post.get("phone") or "").strip() or False,
+            "email_from": email_from,
+            "phone": phone,
             "description": (post.get("description") or "").strip() or False,
         })
 
@@ -135,6 +135,8 @@ class PartnerWebsiteController(http.Controller):
                 {"roles": ROLE_MAP, "selected_role": partner_role, "error": _("Full Name is required.")},
             )
 
+        # minimal insert only: validation, duplicate checks, CRM lead and enlistment
+        # run in the background (partner.attribution.inquiry._cron_process_website_inquiries)
         inquiry = Inquiry.create({
             "company_id": request.env.company.id,
             "applicant_name": applicant_name,
@@ -147,6 +149,7 @@ class PartnerWebsiteController(http.Controller):
             "iban": iban or False,
             "coc": coc or False,
             "irs": irs or False,
+            "website_pending": True,
         })
 
         return request.render(
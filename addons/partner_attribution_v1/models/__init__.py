@@ -6,15 +6,24 @@ from . import sale_order
 
 from . import account_move
 from . import payout_batch
+from . import payout_batch_summary
 # from . import partner_inquiry
 #from . import account_move_payout_batch
 
 #from . import partner_attribution_inquiry
 
-#from . import commission_engine
+from . import commission_engine
 
 from . import partner_attribution_inquiry
 
 from . import partner_inquiry_workflow_patch
 
-from . import account_move_line
\ No newline at end of file
+from . import account_move_line
+from . import ir_attachment
+from . import partner_import_validation
+from . import commission_forecast
+from . import commission_report
+from . import ledger_export
+from . import bi_export
+from . import event_outbox
+from . import payout_sepa
@@ -1,12 +1,18 @@
 # -*- coding: utf-8 -*-
-from odoo import api, fields, models, _
+import logging
+
+from odoo import api, fields, models, tools, _
 from odoo.exceptions import UserError, ValidationError
 
+from .commercial_partner_backfill import _backfill_commercial_partner
+
 try:
     from odoo.http import request
 except Exception:
     request = None
 
+_logger = logging.getLogger(__name__)
+
 COOKIE_NAME = "partner_code"
 SESSION_KEY = "partner_code"
 
@@ -26,6 +32,15 @@ class AccountMove(models.Model):
         help="Attribution copied from Sales Order (locked on post) or set from referral cookie/session on creation.",
         domain=[("partner_state", "=", "approved")],
     )
+    # single indexed column for portal record rules / searches (see init() for the partial index)
+    attributed_commercial_partner_id = fields.Many2one(
+        "res.partner",
+        string="Attributed Commercial Partner",
+        related="attributed_partner_id.commercial_partner_id",
+        store=True,
+        index="btree_not_null",
+        readonly=True,
+    )
     attribution_locked = fields.Boolean(string="Attribution Locked", default=False, copy=False)
     attribution_locked_at = fields.Datetime(string="Attribution Locked At", readonly=True, copy=False)
     attribution_locked_by = fields.Many2one("res.users", string="Attribution Locked By", readonly=True, copy=False)
@@ -37,6 +52,14 @@ class AccountMove(models.Model):
         index=True,
         ondelete="set null",
     )
+    # SEPA credit-transfer file this vendor bill was exported in (deleting the file allows a re-export)
+    partner_payout_sepa_attachment_id = fields.Many2one(
+        "ir.attachment",
+        string="SEPA File",
+        copy=False,
+        readonly=True,
+        ondelete="set null",
+    )
 
     # ----------------------------
     # Commission / Vendor bill
@@ -49,20 +72,30 @@ class AccountMove(models.Model):
         help="Vendor Bill created for this invoice commission.",
     )
 
+    # Snapshot taken on post (and by the draft re-rate job), never recomputed on line edits
     commission_rate_used = fields.Float(
         string="Commission Rate Used (%)",
-        compute="_compute_commission_values",
-        store=True,
         readonly=True,
+        copy=False,
         help="Snapshot of commission rate used for commission calculation.",
     )
 
     commission_amount = fields.Monetary(
         string="Commission Amount",
         currency_field="currency_id",
-        compute="_compute_commission_values",
-        store=True,
         readonly=True,
+        copy=False,
+    )
+
+    # Live preview (not stored)
+    commission_preview_rate = fields.Float(
+        string="Commission Rate Preview (%)",
+        compute="_compute_commission_preview",
+    )
+    commission_preview_amount = fields.Monetary(
+        string="Commission Preview",
+        currency_field="currency_id",
+        compute="_compute_commission_preview",
     )
 
     commission_bill_state = fields.Selection(
@@ -73,6 +106,23 @@ class AccountMove(models.Model):
         readonly=True,
     )
 
+    def _auto_init(self):
+        _backfill_commercial_partner(self.env.cr, "account_move", "attributed_partner_id")
+        return super()._auto_init()
+
+    def init(self):
+        super().init()
+        # portal rule shape: posted customer documents of one commercial partner
+        if not tools.index_exists(self.env.cr, "account_move_pa_v1_attr_commercial_posted_idx"):
+            tools.create_index(
+                self.env.cr,
+                "account_move_pa_v1_attr_commercial_posted_idx",
+                "account_move",
+                ["attributed_commercial_partner_id", "id"],
+                where="move_type IN ('out_invoice', 'out_refund') AND state = 'posted' "
+                      "AND attributed_commercial_partner_id IS NOT NULL",
+            )
+
     # ----------------------------
     # Referral helper
     # ----------------------------
@@ -98,6 +148,8 @@ class AccountMove(models.Model):
 
     @api.model_create_multi
     def create(self, vals_list):
+        # referral cookie/session + partner lookup resolved at most once per batch
+        ref_partner = None
         for vals in vals_list:
             if vals.get("attributed_partner_id"):
                 continue
@@ -106,33 +158,104 @@ class AccountMove(models.Model):
             if move_type not in ("out_invoice", "out_refund"):
                 continue
 
-            ref_code = (self._get_referral_code_from_http() or "").strip()
-            if ref_code:
-                partner = self._find_partner_by_code(ref_code)
-                if partner:
-                    vals["attributed_partner_id"] = partner.id
+            if ref_partner is None:
+                ref_code = (self._get_referral_code_from_http() or "").strip()
+                ref_partner = self._find_partner_by_code(ref_code) if ref_code else self.env["res.partner"]
+            if ref_partner:
+                vals["attributed_partner_id"] = ref_partner.id
 
         moves = super().create(vals_list)
-        moves._pa_v1_process_if_paid()
+
+        # new drafts can never be paid: only run paid-processing on posted+paid moves
+        paid = moves.filtered(lambda m: m.state == "posted" and m.payment_state == "paid")
+        if paid:
+            paid._pa_v1_process_if_paid()
         return moves
 
     # ----------------------------
     # Commission compute
     # ----------------------------
-    @api.depends("attributed_partner_id", "amount_untaxed", "currency_id", "move_type")
-    def _compute_commission_values(self):
+    @api.depends(
+        "attributed_partner_id",
+        "attributed_partner_id.partner_role",
+        "amount_untaxed",
+        "currency_id",
+        "move_type",
+        "invoice_line_ids.price_subtotal",
+        "invoice_line_ids.product_id",
+    )
+    def _compute_commission_preview(self):
+        # rule engine: role -> product category -> amount tier, evaluated per line in one pass
+        values = self.env["partner.attribution.commission.rule"]._compute_move_commissions(self)
         for move in self:
-            rate = 0.0
-            if move.attributed_partner_id:
-                rate = float(move.attributed_partner_id.commission_rate or 0.0)
-
-            move.commission_rate_used = rate
+            move.commission_preview_rate, move.commission_preview_amount = values.get(move.id, (0.0, 0.0))
 
-            amt = (move.amount_untaxed or 0.0) * (rate / 100.0) if rate else 0.0
-            if move.move_type == "out_refund" and amt:
-                amt = -abs(amt)
+    def _pa_v1_snapshot_commission(self):
+        """Freeze commission rate/amount on the moves (one engine pass, internal writes)."""
+        moves = self.filtered(lambda m: m.move_type in ("out_invoice", "out_refund"))
+        if not moves:
+            return
+        values = self.env["partner.attribution.commission.rule"]._compute_move_commissions(moves)
+        Move = moves.sudo().with_context(pa_v1_internal_lock=True)
+        for move in Move:
+            rate, amount = values.get(move.id, (0.0, 0.0))
+            if move.commission_rate_used != rate or move.currency_id.compare_amounts(move.commission_amount, amount):
+                move.write({"commission_rate_used": rate, "commission_amount": amount})
+
+    @api.model
+    def _pa_v1_rerate_commissions(self, domain=None, chunk_size=500, auto_commit=False):
+        """
+        Re-rate the commission snapshot of posted customer invoices/refunds after a commission
+        rule or rate change, as long as it has not reached the ledger (created at payment) or a
+        commission bill. Drafts are skipped: _post() snapshots them anyway.
+        Processes by id chunks and logs progress; returns the number of moves re-rated.
+        """
+        Move = self.sudo()
+        Ledger = self.env["partner.attribution.ledger"].sudo()
+        domain = list(domain or []) + [
+            ("move_type", "in", ("out_invoice", "out_refund")),
+            ("state", "=", "posted"),
+            ("attributed_partner_id", "!=", False),
+            ("commission_vendor_bill_id", "=", False),
+        ]
+        total = Move.search_count(domain)
+        done = 0
+        seen = 0
+        last_id = 0
+        while True:
+            moves = Move.search(domain + [("id", ">", last_id)], order="id asc", limit=chunk_size)
+            if not moves:
+                break
+            last_id = moves[-1].id
+            seen += len(moves)
+            ledgered = set(Ledger.search([("invoice_id", "in", moves.ids)]).mapped("invoice_id").ids)
+            moves = moves.filtered(lambda m: m.id not in ledgered)
+            moves._pa_v1_snapshot_commission()
+            done += len(moves)
+            _logger.info("Partner commission re-rate: %s/%s posted invoices checked, %s re-rated", seen, total, done)
+            if auto_commit:
+                self.env.cr.commit()
+            moves.invalidate_recordset()
+        return done
+
+    @api.model
+    def _cron_rerate_draft_commissions(self):
+        """Cron target (manual trigger): re-rate all posted, not yet accrued invoices in committed chunks."""
+        self._pa_v1_rerate_commissions(auto_commit=True)
+        return True
 
-            move.commission_amount = amt
+    def action_rerate_commission(self):
+        """List action: re-rate the selected posted invoices that are not in the ledger yet."""
+        count = self._pa_v1_rerate_commissions(domain=[("id", "in", self.ids)])
+        return {
+            "type": "ir.actions.client",
+            "tag": "display_notification",
+            "params": {
+                "title": _("Commission Re-rate"),
+                "message": _("%s posted invoice(s) without ledger entry re-rated.") % count,
+                "type": "success",
+            },
+        }
 
     @api.depends("commission_vendor_bill_id", "commission_amount")
     def _compute_commission_bill_state(self):
@@ -283,17 +406,23 @@ class AccountMove(models.Model):
     # Lock behavior (lock on POST)
     # ----------------------------
     def _lock_attribution(self):
-        for move in self:
-            if move.attribution_locked:
-                continue
-            if not move.attributed_partner_id:
-                raise ValidationError(_("Cannot lock invoice attribution without an Attributed Partner."))
-
-            locked_by = move.attribution_locked_by.id if move.attribution_locked_by else self.env.user.id
-
-            move.sudo().write({
+        to_lock = self.filtered(lambda m: not m.attribution_locked)
+        if any(not m.attributed_partner_id for m in to_lock):
+            raise ValidationError(_("Cannot lock invoice attribution without an Attributed Partner."))
+
+        # one write per (locked_by, locked_at) group instead of one per move
+        now = fields.Datetime.now()
+        groups = {}
+        for move in to_lock:
+            key = (move.attribution_locked_by.id or self.env.user.id, move.attribution_locked_at or now)
+            groups.setdefault(key, []).append(move.id)
+
+        # internal call: skip the per-record lock checks of our write() override (sudo only)
+        Move = self.sudo().with_context(pa_v1_internal_lock=True)
+        for (locked_by, locked_at), move_ids in groups.items():
+            Move.browse(move_ids).write({
                 "attribution_locked": True,
-                "attribution_locked_at": move.attribution_locked_at or fields.Datetime.now(),
+                "attribution_locked_at": locked_at,
                 "attribution_locked_by": locked_by,
             })
 
@@ -312,27 +441,40 @@ class AccountMove(models.Model):
     def _create_partner_ledger_if_needed(self, paid_at=None):
         Ledger = self.env["partner.attribution.ledger"].sudo()
 
-        for move in self:
-            if not move._should_create_partner_ledger():
-                continue
+        moves = self.filtered(lambda m: m._should_create_partner_ledger())
+        if not moves:
+            return
 
-            if Ledger.search_count([("invoice_id", "=", move.id)]) > 0:
-                continue
+        existing = set(Ledger.search([("invoice_id", "in", moves.ids)]).mapped("invoice_id").ids)
+        moves = moves.filtered(lambda m: m.id not in existing)
+        if not moves:
+            return
+
+        # one rate lookup per (currency, company, date) for the whole batch
+        rates = Ledger._pa_v1_conversion_rates([Ledger._pa_v1_rate_key(m) for m in moves])
 
+        vals_list = []
+        for move in moves:
             entry_type = "refund" if move.move_type == "out_refund" else "invoice"
             origin = move.reversed_entry_id if entry_type == "refund" else False
 
-            Ledger.create({
+            amount_currency = float(move.commission_amount or 0.0)
+            rate = rates[Ledger._pa_v1_rate_key(move)]
+            vals_list.append({
                 "company_id": move.company_id.id,
                 "partner_id": move.attributed_partner_id.id,
                 "invoice_id": move.id,
                 "origin_invoice_id": origin.id if origin else False,
                 "entry_type": entry_type,
                 "commission_rate_used": float(move.commission_rate_used or 0.0),
-                "commission_amount": float(move.commission_amount or 0.0),
+                "transaction_currency_id": move.currency_id.id,
+                "commission_amount_currency": amount_currency,
+                "conversion_rate": rate,
+                "commission_amount": move.company_id.currency_id.round(amount_currency * rate),
                 "state": "on_hold",
                 "invoice_paid_at": paid_at or fields.Datetime.now(),
             })
+        Ledger.create(vals_list)._pa_v1_emit_events("ledger.created")
 
     # ----------------------------
     # SAFE paid-processing
@@ -367,6 +509,9 @@ class AccountMove(models.Model):
     # Allow editing on draft, prevent changes after lock
     # ----------------------------
     def write(self, vals):
+        if self.env.su and self.env.context.get("pa_v1_internal_lock"):
+            return super().write(vals)
+
         vals = dict(vals)
         locked_fields = {"attributed_partner_id", "attribution_locked", "attribution_locked_at", "attribution_locked_by"}
 
@@ -385,6 +530,12 @@ class AccountMove(models.Model):
 
         return res
 
+    def _post(self, soft=True):
+        posted = super()._post(soft=soft)
+        # freeze commission values once, at post time (also auto-post cron and direct _post callers)
+        posted._pa_v1_snapshot_commission()
+        return posted
+
     def action_post(self):
         res = super().action_post()
 
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+# SQL backfill for the denormalized attributed commercial partner columns (upgrade path).
+import logging
+
+from odoo import tools
+
+_logger = logging.getLogger(__name__)
+
+
+def _backfill_commercial_partner(cr, table, source_column, target_column="attributed_commercial_partner_id"):
+    """
+    On upgrade, create `target_column` on `table` and fill it from
+    res_partner.commercial_partner_id of `source_column` with one UPDATE,
+    so the ORM does not recompute the stored related field record by record.
+    On a fresh install (table or source column not created yet) this is a no-op
+    and the ORM creates the column itself.
+    """
+    if not tools.table_exists(cr, table) or not tools.column_exists(cr, table, source_column):
+        return
+    if tools.column_exists(cr, table, target_column):
+        return
+    tools.create_column(cr, table, target_column, "int4")
+    cr.execute("""
+        UPDATE {table} t
+           SET {target} = rp.commercial_partner_id
+          FROM res_partner rp
+         WHERE rp.id = t.{source}
+    """.format(table=table, target=target_column, source=source_column))
+    _logger.info("partner_attribution_v1: backfilled %s.%s (%s rows)", table, target_column, cr.rowcount)
@@ -1,121 +1,179 @@
 # -*- coding: utf-8 -*-
-from odoo import api, fields, models, _
-from odoo.exceptions import UserError
-
-
-class AccountMove(models.Model):
-    _inherit = "account.move"
-
-    partner_commission_amount = fields.Monetary(
-        string="Partner Commission",
-        currency_field="currency_id",
-        readonly=True,
-        copy=False,
-        help="Computed commission amount created into vendor bill when invoice is posted.",
+from odoo import api, fields, models, tools, _
+from odoo.exceptions import ValidationError
+
+
+def _lookup_rate(index, role, categ_chain, amount):
+    """
+    Walk the compiled index: partner role (specific, then any) -> product category
+    (most specific ancestor first, then any) -> amount tiers (highest threshold first).
+    Returns the matching rate or None.
+    """
+    for role_key in ((role, False) if role else (False,)):
+        by_categ = index.get(role_key)
+        if not by_categ:
+            continue
+        for categ_key in (*categ_chain, False):
+            for amount_min, rate in by_categ.get(categ_key, ()):
+                if abs(amount) >= amount_min:
+                    return rate
+    return None
+
+
+class PartnerAttributionCommissionRule(models.Model):
+    _name = "partner.attribution.commission.rule"
+    _description = "Partner Commission Rule"
+    _order = "company_id, partner_role, product_categ_id, amount_min desc, id"
+
+    name = fields.Char(required=True)
+    active = fields.Boolean(default=True)
+    company_id = fields.Many2one("res.company", required=True, default=lambda self: self.env.company, index=True)
+    currency_id = fields.Many2one(related="company_id.currency_id", readonly=True)
+
+    partner_role = fields.Selection(
+        selection=[
+            ("ap", "Affiliate Partner"),
+            ("lead", "Lead Partner"),
+            ("sales_agent", "Sales Agent"),
+            ("sales_partner", "Sales Partner (Buy–Sell)"),
+        ],
+        string="Partner Role",
+        help="Leave empty to apply to every role.",
     )
-    partner_commission_bill_id = fields.Many2one(
-        "account.move",
-        string="Commission Vendor Bill",
-        readonly=True,
-        copy=False,
+    product_categ_id = fields.Many2one(
+        "product.category",
+        string="Product Category",
+        help="Applies to this category and its children. Leave empty to apply to every category.",
     )
-
-    def _find_partner_for_commission(self):
-        """
-        Find partner from your existing attribution fields.
-        We try fields safely (only if they exist).
-        """
-        self.ensure_one()
-        Partner = self.env["res.partner"].sudo()
-
-        # Try direct link field if your project has it (example: partner_attribution_partner_id)
-        for fname in ["partner_attribution_partner_id", "attribution_partner_id", "partner_id_attribution"]:
-            if fname in self._fields and getattr(self, fname):
-                return getattr(self, fname)
-
-        # Try partner_code on invoice if exists
-        for code_field in ["partner_code", "attribution_partner_code", "x_partner_code"]:
-            if code_field in self._fields:
-                code = (getattr(self, code_field) or "").strip()
-                if code:
-                    return Partner.search([("partner_code", "=", code)], limit=1)
-
-        return False
-
-    def _get_expense_account_for_commission(self):
-        """
-        Pick any valid expense account to avoid 'account_id required' errors.
-        Works in CE.
-        """
-        Account = self.env["account.account"].sudo()
-        acc = Account.search([("account_type", "=", "expense")], limit=1)
-        if not acc:
-            # fallback: any account (last resort)
-            acc = Account.search([], limit=1)
-        if not acc:
-            raise UserError(_("No account found to book commission line. Configure chart of accounts."))
-        return acc
-
-    def _create_commission_vendor_bill(self, partner, amount):
+    amount_min = fields.Monetary(
+        string="Line Amount From",
+        currency_field="currency_id",
+        default=0.0,
+        help="Tier threshold on the invoice line untaxed amount.",
+    )
+    rate = fields.Float(string="Commission Rate (%)", required=True)
+
+    @api.constrains("rate", "amount_min")
+    def _check_rate(self):
+        for rule in self:
+            if rule.rate < 0 or rule.rate > 100:
+                raise ValidationError(_("Commission Rate must be between 0 and 100."))
+            if rule.amount_min < 0:
+                raise ValidationError(_("Tier threshold cannot be negative."))
+
+    # ----------------------------
+    # Compiled index (cached per company, invalidated on any rule change)
+    # ----------------------------
+    @api.model
+    @tools.ormcache("company_id")
+    def _get_rule_index(self, company_id):
+        rows = self.sudo().search_read(
+            [("company_id", "=", company_id)],
+            ["partner_role", "product_categ_id", "amount_min", "rate"],
+        )
+        index = {}
+        for row in rows:
+            categ_id = row["product_categ_id"][0] if row["product_categ_id"] else False
+            index.setdefault(row["partner_role"] or False, {}).setdefault(categ_id, []).append(
+                (row["amount_min"] or 0.0, row["rate"] or 0.0)
+            )
+        return {
+            role: {categ: tuple(sorted(tiers, key=lambda t: -t[0])) for categ, tiers in by_categ.items()}
+            for role, by_categ in index.items()
+        }
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        rules = super().create(vals_list)
+        self.env.registry.clear_cache()
+        return rules
+
+    def write(self, vals):
+        res = super().write(vals)
+        self.env.registry.clear_cache()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env.registry.clear_cache()
+        return res
+
+    def action_trigger_rerate(self):
+        """Arm the one-shot re-rate cron (posted invoices not in the ledger yet) after rules changed; it deactivates itself after the run."""
+        cron = self.env.ref("partner_attribution_v1.ir_cron_pa_v1_rerate_draft_commissions", raise_if_not_found=False)
+        if cron:
+            cron.sudo().write({"active": True, "numbercall": 1, "nextcall": fields.Datetime.now()})
+            cron.sudo()._trigger()
+        return {
+            "type": "ir.actions.client",
+            "tag": "display_notification",
+            "params": {
+                "title": _("Commission Re-rate"),
+                "message": _("Posted invoices without ledger entry will be re-rated in the background."),
+                "type": "info",
+            },
+        }
+
+    # ----------------------------
+    # Bulk evaluation
+    # ----------------------------
+    @api.model
+    def _compute_move_commissions(self, moves):
         """
-        Create Vendor Bill payable to partner for the commission.
+        Evaluate commission for all product lines of `moves` in one pass.
+        Lines without a matching rule use the partner's flat commission_rate.
+        Tier thresholds (amount_min) are in company currency, so line amounts are converted
+        for the lookup; the commission itself stays in invoice currency.
+        Returns {move_id: (rate_used, commission_amount)}.
         """
-        self.ensure_one()
-        if amount <= 0:
-            return False
-
-        # Must have a vendor bill journal
-        journal = self.env["account.journal"].sudo().search([("type", "=", "purchase")], limit=1)
-        if not journal:
-            raise UserError(_("No Purchase Journal found. Create one to generate vendor bills."))
-
-        expense_account = self._get_expense_account_for_commission()
-
-        bill = self.env["account.move"].sudo().create({
-            "move_type": "in_invoice",
-            "partner_id": partner.id,
-            "invoice_date": fields.Date.context_today(self),
-            "journal_id": journal.id,
-            "ref": f"Commission for {self.name or self.ref or self.id}",
-            "invoice_line_ids": [(0, 0, {
-                "name": f"Partner Commission - Invoice {self.name or self.id}",
-                "quantity": 1.0,
-                "price_unit": float(amount),
-                "account_id": expense_account.id,
-            })],
-        })
-        return bill
-
-    def action_post(self):
-        res = super().action_post()
-
-        for move in self:
-            # Only customer invoices/refunds
-            if move.move_type not in ("out_invoice", "out_refund"):
-                continue
+        result = {}
+        flat_rates = {}
+        categ_chains = {}
 
-            # Only once
-            if move.partner_commission_bill_id:
-                continue
+        # one rate lookup per (currency, company, date), shared with ledger creation
+        Ledger = self.env["partner.attribution.ledger"].sudo()
+        attributed = moves.filtered(lambda m: m.attributed_partner_id and m.currency_id and m.company_id)
+        conversion = Ledger._pa_v1_conversion_rates([Ledger._pa_v1_rate_key(m) for m in attributed])
 
-            partner = move._find_partner_for_commission()
+        for move in moves:
+            partner = move.attributed_partner_id
             if not partner:
+                result[move.id] = (0.0, 0.0)
                 continue
 
-            rate = float(getattr(partner, "commission_rate", 0.0) or 0.0) / 100.0
-            if rate <= 0:
-                continue
-
-            base_amount = abs(move.amount_untaxed)  # simple + auditable
-            commission = round(base_amount * rate, 2)
-            if commission <= 0:
-                continue
-
-            bill = move._create_commission_vendor_bill(partner, commission)
-            if bill:
-                move.sudo().write({
-                    "partner_commission_amount": commission,
-                    "partner_commission_bill_id": bill.id,
-                })
-
-        return res
\ No newline at end of file
+            index = self._get_rule_index(move.company_id.id or self.env.company.id)
+            to_company = conversion.get(Ledger._pa_v1_rate_key(move), 1.0)
+            role = partner.partner_role or False
+            if partner.id not in flat_rates:
+                flat_rates[partner.id] = float(partner.commission_rate or 0.0)
+
+            base = commission = 0.0
+            rates = set()
+            for line in move.invoice_line_ids:
+                if line.display_type not in (False, "product"):
+                    continue
+                amount = line.price_subtotal or 0.0
+                categ = line.product_id.categ_id
+                if categ.id not in categ_chains:
+                    categ_chains[categ.id] = tuple(
+                        int(x) for x in reversed((categ.parent_path or "").strip("/").split("/")) if x
+                    )
+                rate = _lookup_rate(index, role, categ_chains[categ.id], amount * to_company)
+                if rate is None:
+                    rate = flat_rates[partner.id]
+                rates.add(rate)
+                base += amount
+                commission += amount * rate / 100.0
+
+            if len(rates) == 1:
+                rate_used = rates.pop()
+            elif not rates:
+                rate_used = flat_rates[partner.id]
+            else:
+                rate_used = round(commission / base * 100.0, 4) if base else 0.0
+
+            if move.move_type == "out_refund" and commission:
+                commission = -abs(commission)
+            result[move.id] = (rate_used, commission)
+
+        return result
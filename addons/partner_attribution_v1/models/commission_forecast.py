@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+from odoo import api, fields, models, tools
+
+
+class PartnerAttributionCommissionForecast(models.Model):
+    _name = "partner.attribution.commission.forecast"
+    _description = "Partner Commission Forecast (open sale orders)"
+    _auto = False
+    _order = "commission_forecast desc"
+    _rec_name = "partner_id"
+
+    partner_id = fields.Many2one("res.partner", string="Attributed Partner", readonly=True)
+    partner_role = fields.Selection(
+        selection=[
+            ("ap", "Affiliate Partner"),
+            ("lead", "Lead Partner"),
+            ("sales_agent", "Sales Agent"),
+            ("sales_partner", "Sales Partner (Buy–Sell)"),
+        ],
+        string="Partner Role",
+        readonly=True,
+    )
+    company_id = fields.Many2one("res.company", readonly=True)
+    currency_id = fields.Many2one("res.currency", string="Company Currency", readonly=True)
+
+    order_count = fields.Integer(string="Open Orders", readonly=True)
+    amount_to_invoice = fields.Monetary(string="Untaxed To Invoice", currency_field="currency_id", readonly=True)
+    commission_rate = fields.Float(string="Commission Rate (%)", readonly=True, group_operator="avg")
+    commission_forecast = fields.Monetary(string="Commission Forecast", currency_field="currency_id", readonly=True)
+
+    def init(self):
+        # Confirmed, not fully invoiced orders; amounts in company currency (order currency_rate).
+        # The partner rate lives in ir.config_parameter (see res.partner.commission_rate), default 5%.
+        tools.drop_view_if_exists(self.env.cr, self._table)
+        self.env.cr.execute("""
+            CREATE OR REPLACE VIEW %s AS (
+                SELECT
+                    MIN(so.id) AS id,
+                    so.attributed_partner_id AS partner_id,
+                    rp.partner_role AS partner_role,
+                    so.company_id AS company_id,
+                    rc.currency_id AS currency_id,
+                    COUNT(DISTINCT so.id) AS order_count,
+                    SUM(sol.untaxed_amount_to_invoice / COALESCE(NULLIF(so.currency_rate, 0), 1.0)) AS amount_to_invoice,
+                    rate.value AS commission_rate,
+                    SUM(sol.untaxed_amount_to_invoice / COALESCE(NULLIF(so.currency_rate, 0), 1.0))
+                        * rate.value / 100.0 AS commission_forecast
+                FROM sale_order so
+                JOIN sale_order_line sol ON sol.order_id = so.id AND sol.display_type IS NULL
+                JOIN res_partner rp ON rp.id = so.attributed_partner_id
+                JOIN res_company rc ON rc.id = so.company_id
+                LEFT JOIN ir_config_parameter icp
+                       ON icp.key = 'partner_attribution_v1.commission_rate.partner_' || so.attributed_partner_id::text
+                CROSS JOIN LATERAL (
+                    SELECT CASE
+                        WHEN icp.value ~ '^\\s*[0-9]+(\\.[0-9]+)?\\s*$' THEN TRIM(icp.value)::numeric
+                        ELSE 5.0
+                    END AS value
+                ) rate
+                WHERE so.state = 'sale'
+                  AND so.invoice_status != 'invoiced'
+                  AND so.attributed_partner_id IS NOT NULL
+                GROUP BY so.attributed_partner_id, rp.partner_role, so.company_id, rc.currency_id, rate.value
+            )
+        """ % self._table)
+
+    @api.model
+    def _get_portal_forecast(self, partner_ids):
+        """
+        Pipeline commission of the current company for the portal dashboard.
+        Read live, not cached: the partner filter is pushed down into the view and served
+        by the sale_order.attributed_partner_id index, so only the partner's open orders are scanned.
+        """
+        if not partner_ids:
+            return 0.0
+        self.env.cr.execute("""
+            SELECT COALESCE(SUM(commission_forecast), 0.0)
+              FROM partner_attribution_commission_forecast
+             WHERE partner_id = ANY(%s) AND company_id = %s
+        """, (list(partner_ids), self.env.company.id))
+        return float(self.env.cr.fetchone()[0])
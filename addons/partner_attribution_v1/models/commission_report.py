@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import logging
+
+from odoo import api, fields, models, _
+
+_logger = logging.getLogger(__name__)
+
+
+class PartnerAttributionReport(models.Model):
+    """
+    Commission analytics cube over a materialized view.
+    Pivot/graph views read the pre-aggregated rows only; the view is
+    refreshed concurrently by cron, so reports never scan the ledger.
+    """
+    _name = "partner.attribution.report"
+    _description = "Partner Commission Analysis"
+    _auto = False
+    _order = "month desc, partner_id"
+    _rec_name = "partner_id"
+
+    partner_id = fields.Many2one("res.partner", string="Attributed Partner", readonly=True)
+    partner_role = fields.Selection(
+        selection=[
+            ("ap", "Affiliate Partner"),
+            ("lead", "Lead Partner"),
+            ("sales_agent", "Sales Agent"),
+            ("sales_partner", "Sales Partner (Buy–Sell)"),
+        ],
+        string="Partner Role",
+        readonly=True,
+    )
+    company_id = fields.Many2one("res.company", readonly=True)
+    currency_id = fields.Many2one("res.currency", string="Company Currency", readonly=True)
+    month = fields.Date(string="Month", readonly=True)
+    state = fields.Selection(
+        [("on_hold", "On Hold"), ("payable", "Payable"), ("paid", "Paid"), ("reversed", "Reversed")],
+        string="Status",
+        readonly=True,
+    )
+
+    invoice_count = fields.Integer(string="Invoices", readonly=True)
+    base_amount = fields.Monetary(string="Untaxed Base", currency_field="currency_id", readonly=True)
+    commission_amount = fields.Monetary(string="Commission", currency_field="currency_id", readonly=True)
+    paid_amount = fields.Monetary(string="Paid", currency_field="currency_id", readonly=True)
+    reversed_amount = fields.Monetary(string="Reversed", currency_field="currency_id", readonly=True)
+
+    def _select_query(self):
+        # one row per (partner, role, company, month, state); MIN(l.id) is unique per group
+        return """
+            SELECT
+                MIN(l.id) AS id,
+                l.partner_id AS partner_id,
+                rp.partner_role AS partner_role,
+                l.company_id AS company_id,
+                l.currency_id AS currency_id,
+                DATE_TRUNC('month', COALESCE(am.invoice_date, l.created_at::date))::date AS month,
+                l.state AS state,
+                COUNT(DISTINCT l.invoice_id) AS invoice_count,
+                SUM(COALESCE(am.amount_untaxed_signed, 0.0)) AS base_amount,
+                SUM(COALESCE(l.commission_amount, 0.0)) AS commission_amount,
+                SUM(CASE WHEN l.state = 'paid' THEN l.commission_amount ELSE 0.0 END) AS paid_amount,
+                SUM(CASE WHEN l.state = 'reversed' THEN l.commission_amount ELSE 0.0 END) AS reversed_amount
+            FROM partner_attribution_ledger l
+            JOIN account_move am ON am.id = l.invoice_id
+            JOIN res_partner rp ON rp.id = l.partner_id
+            GROUP BY
+                l.partner_id,
+                rp.partner_role,
+                l.company_id,
+                l.currency_id,
+                DATE_TRUNC('month', COALESCE(am.invoice_date, l.created_at::date)),
+                l.state
+        """
+
+    def init(self):
+        # (re)created only when missing or when the definition changed (hash kept as the view
+        # comment); otherwise the rows are left to the hourly REFRESH ... CONCURRENTLY
+        query = self._select_query()
+        signature = hashlib.sha1(query.encode()).hexdigest()
+        relkind = self._relkind()
+        if relkind == "m" and self._view_signature() == signature:
+            return
+        if relkind == "v":
+            self.env.cr.execute("DROP VIEW %s CASCADE" % self._table)
+        self.env.cr.execute("DROP MATERIALIZED VIEW IF EXISTS %s CASCADE" % self._table)
+        self.env.cr.execute("CREATE MATERIALIZED VIEW %s AS (%s) WITH DATA" % (self._table, query))
+        # a unique index is required for REFRESH ... CONCURRENTLY
+        self.env.cr.execute("CREATE UNIQUE INDEX %s_id_uniq ON %s (id)" % (self._table, self._table))
+        self.env.cr.execute(
+            "CREATE INDEX %s_month_company_idx ON %s (month, company_id)" % (self._table, self._table)
+        )
+        self.env.cr.execute("COMMENT ON MATERIALIZED VIEW %s IS %%s" % self._table, (signature,))
+
+    def _relkind(self):
+        self.env.cr.execute("SELECT relkind FROM pg_class WHERE relname = %s", (self._table,))
+        row = self.env.cr.fetchone()
+        return row and row[0]
+
+    def _view_signature(self):
+        self.env.cr.execute("SELECT obj_description(%s::regclass, 'pg_class')", (self._table,))
+        row = self.env.cr.fetchone()
+        return row and row[0]
+
+    # ----------------------------
+    # Refresh
+    # ----------------------------
+    @api.model
+    def _refresh_materialized_view(self):
+        """Rebuild the cube without blocking readers (CONCURRENTLY keeps the old rows visible)."""
+        self.env.cr.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY %s" % self._table)
+        self.invalidate_model()
+        _logger.info("partner_attribution_v1: refreshed %s", self._table)
+        return True
+
+    @api.model
+    def _cron_refresh_commission_report(self):
+        return self._refresh_materialized_view()
+
+    @api.model
+    def action_refresh_report(self):
+        self._refresh_materialized_view()
+        return {
+            "type": "ir.actions.client",
+            "tag": "display_notification",
+            "params": {
+                "title": _("Commission Analysis"),
+                "message": _("Report data refreshed."),
+                "type": "success",
+                "next": {"type": "ir.actions.client", "tag": "soft_reload"},
+            },
+        }
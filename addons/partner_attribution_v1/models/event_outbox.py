@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+import datetime
+import json
+import logging
+
+import requests
+
+from odoo import api, fields, models, _
+from odoo.exceptions import UserError, ValidationError
+
+_logger = logging.getLogger(__name__)
+
+OUTBOX_RETENTION_DAYS = 7
+OUTBOX_MAX_BACKOFF = 3600  # seconds
+HTTP_SINK_TIMEOUT = 10  # seconds
+
+
+class PartnerAttributionEvent(models.Model):
+    """
+    Transactional outbox: rows are inserted in the same transaction as the ledger / payout
+    change they describe, and delivered later by the sink dispatcher (at-least-once).
+    """
+    _name = "partner.attribution.event"
+    _description = "Partner Attribution Outbox Event"
+    _order = "id"
+    _rec_name = "event_type"
+
+    event_type = fields.Char(required=True, readonly=True, index=True)
+    res_model = fields.Char(string="Model", readonly=True)
+    res_id = fields.Many2oneReference(string="Record ID", model_field="res_model", readonly=True)
+    company_id = fields.Many2one("res.company", readonly=True, index=True)
+    payload = fields.Text(readonly=True)
+
+    def init(self):
+        # emitting transaction id (txid_current, bigint: the ORM has no 64-bit integer field);
+        # delivery order is (txid, id), see _fetch_deliverable
+        self.env.cr.execute("ALTER TABLE %s ADD COLUMN IF NOT EXISTS txid bigint" % self._table)
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS partner_attribution_event_txid_id_idx
+                ON %s (txid, id)
+        """ % self._table)
+
+    @api.model
+    def _emit(self, events):
+        """
+        Append events to the outbox with one INSERT, inside the caller's transaction.
+        `events` is a list of dicts: event_type, res_model, res_id, company_id, payload (dict).
+        """
+        if not events:
+            return
+        self.env.cr.execute("""
+            INSERT INTO partner_attribution_event
+                   (event_type, res_model, res_id, company_id, payload, txid,
+                    create_uid, create_date, write_uid, write_date)
+            SELECT UNNEST(%s::varchar[]), UNNEST(%s::varchar[]), UNNEST(%s::int[]), UNNEST(%s::int[]),
+                   UNNEST(%s::text[]), txid_current(),
+                   %s, (now() at time zone 'UTC'), %s, (now() at time zone 'UTC')
+        """, (
+            [e["event_type"] for e in events],
+            [e.get("res_model") for e in events],
+            [e.get("res_id") for e in events],
+            [e.get("company_id") or None for e in events],
+            [json.dumps(e.get("payload") or {}, default=str, sort_keys=True) for e in events],
+            self.env.uid,
+            self.env.uid,
+        ))
+
+    @api.model
+    def _fetch_deliverable(self, after, limit):
+        """
+        Next events after the (txid, id) cursor `after`, in delivery order.
+        Only events of transactions older than the snapshot xmin are returned: those
+        transactions are finished, so no older event can still appear behind the cursor.
+        """
+        self.env.cr.execute("""
+            SELECT id, txid, event_type, res_model, res_id, company_id, payload, create_date
+              FROM partner_attribution_event
+             WHERE (txid, id) > (%s, %s)
+               AND txid < txid_snapshot_xmin(txid_current_snapshot())
+          ORDER BY txid, id
+             LIMIT %s
+        """, (after[0], after[1], limit))
+        return [{
+            "id": row[0],
+            "txid": row[1],
+            "event_type": row[2],
+            "res_model": row[3],
+            "res_id": row[4],
+            "company_id": row[5],
+            "payload": json.loads(row[6] or "{}"),
+            "created_at": fields.Datetime.to_string(row[7]),
+        } for row in self.env.cr.fetchall()]
+
+    @api.model
+    def _purge_delivered(self):
+        """
+        Drop events older than the retention window that every sink has delivered.
+        Archived sinks count too: their undelivered events are kept until they are deleted.
+        """
+        sinks = self.env["partner.attribution.event.sink"].sudo().with_context(active_test=False).search([])
+        limit_date = fields.Datetime.now() - datetime.timedelta(days=OUTBOX_RETENTION_DAYS)
+        if sinks:
+            txid, event_id = min(sink._get_cursor() for sink in sinks)
+            self.env.cr.execute("""
+                DELETE FROM partner_attribution_event
+                 WHERE (txid, id) <= (%s, %s) AND create_date < %s
+            """, (txid, event_id, limit_date))
+        else:
+            self.env.cr.execute("DELETE FROM partner_attribution_event WHERE create_date < %s", (limit_date,))
+
+
+class PartnerAttributionEventSink(models.Model):
+    """
+    Delivery target of the outbox. The dispatcher cron runs as root and writes to the
+    configured file path / URL, so sinks are editable by Settings administrators only.
+    """
+    _name = "partner.attribution.event.sink"
+    _description = "Partner Attribution Event Sink"
+    _order = "sequence, id"
+
+    name = fields.Char(required=True)
+    active = fields.Boolean(default=True)
+    sequence = fields.Integer(default=10)
+
+    sink_type = fields.Selection(
+        [("file", "Local File (JSON Lines)"), ("http", "HTTP Endpoint")],
+        required=True,
+        default="file",
+    )
+    file_path = fields.Char(string="File Path", help="Events are appended one JSON object per line.")
+    url = fields.Char(string="Endpoint URL", help="Receives POST {\"events\": [...]}; 429/503 with Retry-After pauses delivery.")
+
+    batch_size = fields.Integer(default=500, required=True)
+    max_batches_per_run = fields.Integer(
+        string="Batches per Run",
+        default=20,
+        required=True,
+        help="Backpressure: remaining events wait for the next dispatcher run.",
+    )
+
+    # delivery cursor: last delivered (txid, event id); only advanced after a successful delivery
+    last_txid = fields.Char(string="Cursor Transaction", default="0", readonly=True, copy=False)
+    last_event_id = fields.Integer(string="Cursor Event", default=0, readonly=True, copy=False)
+    last_delivery_at = fields.Datetime(readonly=True, copy=False)
+
+    failure_count = fields.Integer(readonly=True, copy=False)
+    next_attempt_at = fields.Datetime(string="Paused Until", readonly=True, copy=False)
+    last_error = fields.Text(readonly=True, copy=False)
+
+    @api.constrains("batch_size", "max_batches_per_run")
+    def _check_batch_limits(self):
+        for sink in self:
+            if sink.batch_size <= 0 or sink.max_batches_per_run <= 0:
+                raise ValidationError(_("Batch size and batches per run must be positive."))
+
+    def _get_cursor(self):
+        self.ensure_one()
+        return int(self.last_txid or 0), self.last_event_id or 0
+
+    # ----------------------------
+    # Sinks (one _deliver_<sink_type> method per type)
+    # ----------------------------
+    def _deliver_file(self, events):
+        if not self.file_path:
+            raise UserError(_("Event sink %s has no file path.") % self.name)
+        with open(self.file_path, "a", encoding="utf-8") as out:
+            for event in events:
+                out.write(json.dumps(event, sort_keys=True) + "\n")
+            out.flush()
+
+    def _deliver_http(self, events):
+        if not self.url:
+            raise UserError(_("Event sink %s has no endpoint URL.") % self.name)
+        response = requests.post(self.url, json={"events": events}, timeout=HTTP_SINK_TIMEOUT)
+        if response.status_code in (429, 503):
+            retry_after = response.headers.get("Retry-After", "")
+            return int(retry_after) if retry_after.isdigit() else 60
+        response.raise_for_status()
+        return None
+
+    # ----------------------------
+    # Dispatcher
+    # ----------------------------
+    def _dispatch(self, auto_commit=False):
+        """
+        Deliver ordered batches until the outbox is drained or the run budget is used.
+        A failed or throttled batch is retried as a whole later (at-least-once: consumers
+        dedupe on event id). Returns True when events are left behind the budget.
+        """
+        self.ensure_one()
+        Event = self.env["partner.attribution.event"].sudo()
+        for _i in range(self.max_batches_per_run):
+            events = Event._fetch_deliverable(self._get_cursor(), self.batch_size)
+            if not events:
+                return False
+            try:
+                retry_after = getattr(self, "_deliver_%s" % self.sink_type)(events)
+            except Exception as e:
+                backoff = min(60 * 2 ** self.failure_count, OUTBOX_MAX_BACKOFF)
+                _logger.warning("partner_attribution_v1: event sink %s failed, retry in %ss: %s", self.name, backoff, e)
+                self.write({
+                    "failure_count": self.failure_count + 1,
+                    "next_attempt_at": fields.Datetime.now() + datetime.timedelta(seconds=backoff),
+                    "last_error": str(e),
+                })
+                return False
+            if retry_after:
+                self.next_attempt_at = fields.Datetime.now() + datetime.timedelta(seconds=retry_after)
+                return False
+
+            self.write({
+                "last_txid": str(events[-1]["txid"]),
+                "last_event_id": events[-1]["id"],
+                "last_delivery_at": fields.Datetime.now(),
+                "failure_count": 0,
+                "next_attempt_at": False,
+                "last_error": False,
+            })
+            if auto_commit:
+                self.env.cr.commit()
+        return True
+
+    @api.model
+    def _cron_dispatch_events(self):
+        now = fields.Datetime.now()
+        backlog = False
+        for sink in self.sudo().search([]):
+            if sink.next_attempt_at and sink.next_attempt_at > now:
+                continue
+            backlog = sink._dispatch(auto_commit=True) or backlog
+        self.env["partner.attribution.event"].sudo()._purge_delivered()
+
+        if backlog:
+            cron = self.env.ref("partner_attribution_v1.ir_cron_pa_v1_dispatch_events", raise_if_not_found=False)
+            if cron:
+                cron.sudo()._trigger(now + datetime.timedelta(minutes=1))
+        return True
+
+    def action_dispatch_now(self):
+        for sink in self:
+            sink._dispatch()
+        return True
+
+    def action_resume(self):
+        self.write({"next_attempt_at": False, "failure_count": 0})
+        return True
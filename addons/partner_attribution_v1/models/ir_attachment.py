@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import os
+import tempfile
+
+from odoo import api, models, _
+from odoo.exceptions import UserError
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+# DB attachment storage cannot stream: the payload is read into memory, so keep it small
+DB_STORAGE_MAX_BYTES = 25 * 1024 * 1024  # 25MB
+
+
+class IrAttachment(models.Model):
+    _inherit = "ir.attachment"
+
+    # ----------------------------
+    # Streaming upload (portal documents)
+    # ----------------------------
+    @api.model
+    def _pa_v1_stream_to_filestore(self, stream, max_bytes):
+        """
+        Copy an upload stream into the filestore chunk by chunk.
+        The sha1 checksum is computed while writing, so the payload is never
+        held in memory as a whole. Returns (store_fname, checksum, file_size).
+        Raises UserError when the stream is empty or exceeds max_bytes.
+        """
+        filestore = self._filestore()
+        os.makedirs(filestore, exist_ok=True)
+
+        sha = hashlib.sha1()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(prefix=".pa_v1_upload_", dir=filestore)
+        try:
+            with os.fdopen(fd, "wb") as fp:
+                while True:
+                    chunk = stream.read(UPLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise UserError(_("The uploaded file exceeds the maximum allowed size."))
+                    sha.update(chunk)
+                    fp.write(chunk)
+
+            if not size:
+                raise UserError(_("The uploaded file is empty."))
+
+            checksum = sha.hexdigest()
+            # same layout as ir.attachment._get_path(): scatter across 256 dirs
+            fname = checksum[:2] + "/" + checksum
+            full_path = self._full_path(fname)
+            if os.path.isfile(full_path):
+                # identical blob already stored: keep the existing file
+                os.unlink(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                os.replace(tmp_path, full_path)
+                self._mark_for_gc(fname)
+            return fname, checksum, size
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    @api.model
+    def _pa_v1_create_from_stream(self, stream, max_bytes, vals):
+        """
+        Create (or reuse) an attachment from an upload stream.
+        If the same res_model/res_id already owns a blob with the same checksum,
+        that attachment is returned instead of storing another copy.
+        """
+        if self._storage() != "file":
+            # DB storage cannot be streamed; read with a bounded buffer instead
+            limit = min(max_bytes, DB_STORAGE_MAX_BYTES)
+            raw = stream.read(limit + 1) or b""
+            if not raw:
+                raise UserError(_("The uploaded file is empty."))
+            if len(raw) > limit:
+                raise UserError(_(
+                    "The file exceeds the maximum allowed size (%s MB). Large files need "
+                    "filestore attachment storage (ir_attachment.location = file).",
+                    limit // (1024 * 1024),
+                ))
+            existing = self._pa_v1_find_duplicate(vals, self._compute_checksum(raw))
+            if existing:
+                return existing
+            return self.create(dict(vals, raw=raw))
+
+        store_fname, checksum, file_size = self._pa_v1_stream_to_filestore(stream, max_bytes)
+
+        existing = self._pa_v1_find_duplicate(vals, checksum)
+        if existing:
+            return existing
+
+        # create() drops store_fname/checksum/file_size: create the record, then point it at the blob
+        attachment = self.create(dict(vals, type="binary"))
+        self.env.cr.execute("""
+            UPDATE ir_attachment
+               SET store_fname = %s, checksum = %s, file_size = %s, db_datas = NULL
+             WHERE id = %s
+        """, (store_fname, checksum, file_size, attachment.id))
+        attachment.invalidate_recordset(["store_fname", "checksum", "file_size", "db_datas", "raw", "datas"])
+        self._pa_v1_unmark_for_gc(store_fname)
+        return attachment
+
+    @api.model
+    def _pa_v1_unmark_for_gc(self, fname):
+        """The blob is referenced by an attachment now: drop it from the filestore GC checklist."""
+        checklist = self._full_path("checklist/" + fname)
+        if os.path.exists(checklist):
+            os.unlink(checklist)
+
+    @api.model
+    def _pa_v1_find_duplicate(self, vals, checksum):
+        return self.search([
+            ("res_model", "=", vals.get("res_model")),
+            ("res_id", "=", vals.get("res_id")),
+            ("checksum", "=", checksum),
+        ], limit=1)
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+# KYC / bank-detail format checks shared by inquiries, bulk import validation and payouts.
+import re
+import string
+
+# IBAN total length per country (ISO 13616 registry)
+IBAN_LENGTHS = {
+    "AD": 24, "AE": 23, "AL": 28, "AT": 20, "AZ": 28, "BA": 20, "BE": 16, "BG": 22,
+    "BH": 22, "BR": 29, "BY": 28, "CH": 21, "CR": 22, "CY": 28, "CZ": 24, "DE": 22,
+    "DK": 18, "DO": 28, "EE": 20, "EG": 29, "ES": 24, "FI": 18, "FO": 18, "FR": 27,
+    "GB": 22, "GE": 22, "GI": 23, "GL": 18, "GR": 27, "GT": 28, "HR": 21, "HU": 28,
+    "IE": 22, "IL": 23, "IQ": 23, "IS": 26, "IT": 27, "JO": 30, "KW": 30, "KZ": 20,
+    "LB": 28, "LC": 32, "LI": 21, "LT": 20, "LU": 20, "LV": 21, "MC": 27, "MD": 24,
+    "ME": 22, "MK": 19, "MR": 27, "MT": 31, "MU": 30, "NL": 18, "NO": 15, "PK": 24,
+    "PL": 28, "PS": 29, "PT": 25, "QA": 29, "RO": 24, "RS": 22, "SA": 24, "SC": 31,
+    "SE": 24, "SI": 19, "SK": 24, "SM": 27, "ST": 25, "SV": 28, "TL": 23, "TN": 24,
+    "TR": 26, "UA": 29, "VA": 22, "VG": 24, "XK": 20,
+}
+
+# A=10 .. Z=35, digits unchanged: one str.translate() instead of per-char concatenation
+_IBAN_TRANSLATION = str.maketrans({ch: str(i) for i, ch in enumerate(string.ascii_uppercase, start=10)})
+
+_IBAN_RE = re.compile(r"^[A-Z]{2}[0-9]{2}[A-Z0-9]+$")
+
+# EU VAT formats (without the country prefix); other prefixes get a generic check
+VAT_PATTERNS = {
+    "AT": r"U[0-9]{8}", "BE": r"[01][0-9]{9}", "BG": r"[0-9]{9,10}", "CY": r"[0-9]{8}[A-Z]",
+    "CZ": r"[0-9]{8,10}", "DE": r"[0-9]{9}", "DK": r"[0-9]{8}", "EE": r"[0-9]{9}",
+    "EL": r"[0-9]{9}", "ES": r"[0-9A-Z][0-9]{7}[0-9A-Z]", "FI": r"[0-9]{8}",
+    "FR": r"[0-9A-Z]{2}[0-9]{9}", "HR": r"[0-9]{11}", "HU": r"[0-9]{8}",
+    "IE": r"[0-9][0-9A-Z+*][0-9]{5}[A-Z]{1,2}", "IT": r"[0-9]{11}", "LT": r"([0-9]{9}|[0-9]{12})",
+    "LU": r"[0-9]{8}", "LV": r"[0-9]{11}", "MT": r"[0-9]{8}", "NL": r"[0-9]{9}B[0-9]{2}",
+    "PL": r"[0-9]{10}", "PT": r"[0-9]{9}", "RO": r"[0-9]{2,10}", "SE": r"[0-9]{12}",
+    "SI": r"[0-9]{8}", "SK": r"[0-9]{10}", "GB": r"([0-9]{9}|[0-9]{12}|GD[0-9]{3}|HA[0-9]{3})",
+    "CHE": r"[0-9]{9}(MWST|TVA|IVA)?",
+}
+_VAT_RES = {k: re.compile(r"^%s$" % v) for k, v in VAT_PATTERNS.items()}
+_VAT_GENERIC_RE = re.compile(r"^[A-Z]{2}[0-9A-Z+*.]{2,13}$")
+
+# Chamber of Commerce numbers: NL KvK is 8 digits, other registries 4-15 alphanumerics
+COC_PATTERNS = {
+    "NL": re.compile(r"^[0-9]{8}$"),
+    "BE": re.compile(r"^[01][0-9]{9}$"),
+}
+_COC_GENERIC_RE = re.compile(r"^[0-9A-Z]{4,15}$")
+
+
+def _clean_iban(iban):
+    return re.sub(r"\s+", "", iban or "").upper()
+
+
+def _iban_check(iban):
+    """
+    Validate an IBAN and return (clean_iban, error or False).
+    Checks charset, country-specific length and the ISO 7064 mod-97 checksum.
+    """
+    iban = _clean_iban(iban)
+    if not iban:
+        return iban, "missing"
+    if len(iban) < 15 or len(iban) > 34 or not _IBAN_RE.match(iban):
+        return iban, "format"
+    expected = IBAN_LENGTHS.get(iban[:2])
+    if expected and len(iban) != expected:
+        return iban, "length"
+    if int((iban[4:] + iban[:4]).translate(_IBAN_TRANSLATION)) % 97 != 1:
+        return iban, "checksum"
+    return iban, False
+
+
+def _iban_is_valid(iban: str) -> bool:
+    return not _iban_check(iban)[1]
+
+
+def _vat_check(vat, country_code=False):
+    """Return an error code when the VAT number format is wrong, False otherwise."""
+    vat = re.sub(r"[\s.\-]+", "", vat or "").upper()
+    if not vat:
+        return "missing"
+    prefix = vat[:3] if vat.startswith("CHE") else vat[:2]
+    if not prefix.isalpha() and country_code:
+        prefix = country_code.upper()
+        vat = prefix + vat
+    pattern = _VAT_RES.get(prefix)
+    if pattern:
+        return False if pattern.match(vat[len(prefix):]) else "format"
+    return False if _VAT_GENERIC_RE.match(vat) else "format"
+
+
+def _coc_check(coc, country_code=False):
+    """Return an error code when the CoC number format is wrong, False otherwise."""
+    coc = re.sub(r"[\s.\-]+", "", coc or "").upper()
+    if not coc:
+        return "missing"
+    pattern = COC_PATTERNS.get((country_code or "").upper(), _COC_GENERIC_RE)
+    return False if pattern.match(coc) else "format"
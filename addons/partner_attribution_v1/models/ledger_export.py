@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+import csv
+import io
+import os
+import tempfile
+from urllib.parse import urlencode
+
+from odoo import api, fields, models, _
+from odoo.exceptions import UserError
+
+try:
+    import xlsxwriter
+except Exception:
+    xlsxwriter = None
+
+EXPORT_ITERSIZE = 2000
+EXPORT_STREAM_CHUNK = 64 * 1024
+EXPORT_STATES = ("on_hold", "payable", "paid", "reversed")
+XLSX_MAX_ROWS = 1048576  # Excel worksheet limit, header row included
+
+EXPORT_HEADER = [
+    "ledger_id", "invoice", "invoice_date", "partner", "type", "status",
+    "invoice_currency", "commission_invoice_currency", "commission", "currency",
+    "vendor_bill", "payout_batch", "invoice_paid_at",
+]
+
+EXPORT_QUERY = """
+    SELECT l.id, am.name, am.invoice_date, rp.name, l.entry_type, l.state,
+           tc.name, l.commission_amount_currency, l.commission_amount, cc.name,
+           vb.name, pb.name, l.invoice_paid_at
+      FROM partner_attribution_ledger l
+      JOIN account_move am ON am.id = l.invoice_id
+      JOIN res_partner rp ON rp.id = l.partner_id
+ LEFT JOIN res_currency tc ON tc.id = l.transaction_currency_id
+ LEFT JOIN res_currency cc ON cc.id = l.currency_id
+ LEFT JOIN account_move vb ON vb.id = l.vendor_bill_id
+ LEFT JOIN partner_attribution_payout_batch pb ON pb.id = l.payout_batch_id
+     WHERE {where}
+  ORDER BY l.id
+"""
+
+
+def _ledger_export_query(scope_sql, scope_params, date_from=None, date_to=None, state=None):
+    """
+    Build the export SELECT. `scope_sql` restricts the rows (partner or companies) because
+    the raw cursor bypasses record rules. Returns (query, params).
+    """
+    where = [scope_sql]
+    params = list(scope_params)
+    if date_from:
+        where.append("COALESCE(am.invoice_date, l.created_at::date) >= %s")
+        params.append(date_from)
+    if date_to:
+        where.append("COALESCE(am.invoice_date, l.created_at::date) <= %s")
+        params.append(date_to)
+    if state in EXPORT_STATES:
+        where.append("l.state = %s")
+        params.append(state)
+    return EXPORT_QUERY.format(where=" AND ".join(where)), params
+
+
+def _iter_ledger_rows(registry, query, params):
+    """
+    Yield rows from a PostgreSQL server-side (named) cursor, EXPORT_ITERSIZE at a time.
+    Uses its own cursor: the generator is consumed after the request transaction ended.
+    """
+    with registry.cursor() as cr:
+        named = cr._cnx.cursor("pa_v1_ledger_export")
+        named.itersize = EXPORT_ITERSIZE
+        try:
+            named.execute(query, params)
+            yield from named
+        finally:
+            named.close()
+
+
+def _iter_csv(rows):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(EXPORT_HEADER)
+    for row in rows:
+        writer.writerow(["" if v is None else v for v in row])
+        if buf.tell() >= EXPORT_STREAM_CHUNK:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+
+def _iter_xlsx(rows):
+    """
+    XLSX in constant memory: rows are flushed to a temp file, which is then streamed out.
+    The whole workbook is written before the first byte is sent (XLSX is a zip archive),
+    so large exports should use CSV, which streams as rows are read.
+    Past the worksheet row limit, rows continue on a new sheet (Ledger (2), ...).
+    """
+    with tempfile.TemporaryDirectory(prefix="pa_v1_export_") as tmpdir:
+        path = os.path.join(tmpdir, "ledger.xlsx")
+        workbook = xlsxwriter.Workbook(path, {"constant_memory": True, "tmpdir": tmpdir})
+        date_fmt = workbook.add_format({"num_format": "yyyy-mm-dd"})
+        datetime_fmt = workbook.add_format({"num_format": "yyyy-mm-dd hh:mm:ss"})
+        sheet, row_no = None, XLSX_MAX_ROWS
+        for row in rows:
+            if row_no >= XLSX_MAX_ROWS:
+                sheet_count = len(workbook.worksheets()) + 1
+                sheet = workbook.add_worksheet("Ledger" if sheet_count == 1 else "Ledger (%s)" % sheet_count)
+                sheet.write_row(0, 0, EXPORT_HEADER)
+                row_no = 1
+            for col, value in enumerate(row):
+                if value is None:
+                    continue
+                if col == 2:
+                    sheet.write_datetime(row_no, col, fields.Datetime.to_datetime(value), date_fmt)
+                elif col == 12:
+                    sheet.write_datetime(row_no, col, value, datetime_fmt)
+                else:
+                    sheet.write(row_no, col, value)
+            row_no += 1
+        if sheet is None:
+            workbook.add_worksheet("Ledger").write_row(0, 0, EXPORT_HEADER)
+        workbook.close()
+
+        with open(path, "rb") as fp:
+            while True:
+                chunk = fp.read(EXPORT_STREAM_CHUNK)
+                if not chunk:
+                    break
+                yield chunk
+
+
+def _iter_export(registry, query, params, file_format):
+    rows = _iter_ledger_rows(registry, query, params)
+    if file_format == "xlsx":
+        if not xlsxwriter:
+            raise UserError(_("XLSX export requires the Python package 'xlsxwriter'."))
+        return _iter_xlsx(rows)
+    return _iter_csv(rows)
+
+
+class PartnerAttributionLedgerExport(models.TransientModel):
+    _name = "partner.attribution.ledger.export"
+    _description = "Partner Ledger Export"
+
+    date_from = fields.Date(string="From")
+    date_to = fields.Date(string="To")
+    state = fields.Selection(
+        [("on_hold", "On Hold"), ("payable", "Payable"), ("paid", "Paid"), ("reversed", "Reversed")],
+        string="Status",
+        help="Leave empty to export every status.",
+    )
+    file_format = fields.Selection(
+        [("csv", "CSV"), ("xlsx", "Excel (XLSX)")],
+        default="csv",
+        required=True,
+        help="CSV is streamed while the ledger is read. XLSX is built completely on the server before "
+             "the download starts and is split into sheets of about one million rows: use CSV for large exports.",
+    )
+
+    @api.constrains("date_from", "date_to")
+    def _check_dates(self):
+        for wizard in self:
+            if wizard.date_from and wizard.date_to and wizard.date_from > wizard.date_to:
+                raise UserError(_("'From' must be before 'To'."))
+
+    def action_export(self):
+        """Streamed by the backend export route; nothing is built in memory here."""
+        self.ensure_one()
+        params = {"format": self.file_format}
+        if self.date_from:
+            params["date_from"] = fields.Date.to_string(self.date_from)
+        if self.date_to:
+            params["date_to"] = fields.Date.to_string(self.date_to)
+        if self.state:
+            params["state"] = self.state
+        return {
+            "type": "ir.actions.act_url",
+            "url": "/partner_attribution/ledger/export?%s" % urlencode(params),
+            "target": "self",
+        }
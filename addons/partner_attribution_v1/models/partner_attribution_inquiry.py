@@ -1,25 +1,14 @@
 # -*- coding: utf-8 -*-
+import logging
+from datetime import timedelta
+
 from odoo import api, fields, models, _
 from odoo.exceptions import UserError
-import re
-
 
-def _iban_is_valid(iban: str) -> bool:
-    iban = (iban or "").replace(" ", "").upper()
-    if not iban or len(iban) < 15 or len(iban) > 34:
-        return False
-    if not re.match(r"^[A-Z0-9]+$", iban):
-        return False
+from .kyc_validation import _iban_is_valid
+from .res_partner import _normalize_email, _normalize_phone
 
-    rearranged = iban[4:] + iban[:4]
-    digits = ""
-    for ch in rearranged:
-        digits += ch if ch.isdigit() else str(ord(ch) - 55)  # A=10..Z=35
-
-    mod = 0
-    for c in digits:
-        mod = (mod * 10 + int(c)) % 97
-    return mod == 1
+_logger = logging.getLogger(__name__)
 
 
 class PartnerAttributionInquiry(models.Model):
@@ -37,6 +26,10 @@ class PartnerAttributionInquiry(models.Model):
     phone = fields.Char(string="Phone")
     note = fields.Text(string="Message / Note")
 
+    # same keys as res.partner/crm.lead email_normalized / phone_sanitized (no such fields here)
+    dedupe_email = fields.Char(string="Dedupe Email", compute="_compute_dedupe_keys", store=True, index=True, copy=False)
+    dedupe_phone = fields.Char(string="Dedupe Phone", compute="_compute_dedupe_keys", store=True, index=True, copy=False)
+
     partner_role = fields.Selection(
         selection=[
             ("ap", "Affiliate Partner"),
@@ -76,6 +69,23 @@ class PartnerAttributionInquiry(models.Model):
     partner_id = fields.Many2one("res.partner", string="Created Partner", readonly=True, copy=False)
     crm_lead_id = fields.Many2one("crm.lead", string="CRM Lead", readonly=True, copy=False)
     signup_url = fields.Char(string="Signup / Reset URL", readonly=True, copy=False)
+    approval_error = fields.Char(string="Approval Error", readonly=True, copy=False)
+
+    # Website submissions are only inserted by the public form; screening runs in a cron
+    website_pending = fields.Boolean(
+        string="Pending Website Processing",
+        default=False,
+        copy=False,
+        index=True,
+        readonly=True,
+    )
+    website_error = fields.Char(string="Website Processing Error", readonly=True, copy=False)
+
+    @api.depends("email", "phone")
+    def _compute_dedupe_keys(self):
+        for rec in self:
+            rec.dedupe_email = _normalize_email(rec.email)
+            rec.dedupe_phone = _normalize_phone(rec.env, rec.phone)
 
     # ----------------------------
     # Admission Rules (stage-based)
@@ -96,7 +106,7 @@ class PartnerAttributionInquiry(models.Model):
 
             # Strict validations only on approve:
             if stage != "approve":
-                return True
+                continue
 
             # Email required for portal creation
             if not rec.email:
@@ -124,17 +134,10 @@ class PartnerAttributionInquiry(models.Model):
     # ----------------------------
     # CRM Lead creation
     # ----------------------------
-    def _ensure_crm_lead(self):
+    def _prepare_crm_lead_vals(self):
         self.ensure_one()
-        if "crm.lead" not in self.env:
-            return False
-        if self.crm_lead_id:
-            return self.crm_lead_id
-
         role_label = dict(self._fields["partner_role"].selection).get(self.partner_role)
-        Lead = self.env["crm.lead"].sudo()
-
-        lead = Lead.create({
+        return {
             "name": "%s (%s)" % (self.applicant_company or self.applicant_name, role_label),
             "contact_name": self.applicant_name,
             "partner_name": self.applicant_company or False,
@@ -150,61 +153,136 @@ class PartnerAttributionInquiry(models.Model):
                 self.note or "",
             ])).strip() or False,
             "company_id": self.company_id.id,
-        })
+        }
 
-        self.sudo().write({"crm_lead_id": lead.id})
-        return lead
+    def _ensure_crm_leads(self):
+        """Create the missing CRM leads of the recordset with a single create()."""
+        if "crm.lead" not in self.env:
+            return False
+
+        todo = self.filtered(lambda r: not r.crm_lead_id)
+        if todo:
+            leads = self.env["crm.lead"].sudo().create([rec._prepare_crm_lead_vals() for rec in todo])
+            for rec, lead in zip(todo, leads):
+                rec.sudo().write({"crm_lead_id": lead.id})
+        return self.mapped("crm_lead_id")
+
+    def _ensure_crm_lead(self):
+        self.ensure_one()
+        if "crm.lead" not in self.env:
+            return False
+        return self._ensure_crm_leads()
 
     # ----------------------------
-    # Portal user + fresh signup/reset link
+    # Portal users + fresh signup/reset links (batched)
     # ----------------------------
-    def _ensure_portal_user_and_link(self, partner):
-        email = (partner.email or "").strip().lower()
-        if not email:
+    def _ensure_portal_users_and_links(self, partners):
+        """
+        Create or link the portal users of all partners at once.
+        Invitation/reset emails are queued in mail.mail (mail queue cron) instead of being sent inline.
+        Returns ({partner_id: signup_url}, {partner_id: invitation error}).
+        """
+        partners = partners.sudo()
+        if any(not (p.email or "").strip() for p in partners):
             raise UserError(_("Partner email is required to create a Portal login."))
 
         Users = self.env["res.users"].sudo()
         portal_group = self.env.ref("base.group_portal")
 
-        user = Users.search([("login", "=", email)], limit=1)
-        if not user:
-            user = Users.create({
-                "name": partner.name,
-                "login": email,
-                "email": email,
-                "partner_id": partner.id,
-                "groups_id": [(6, 0, [portal_group.id])],
-                "active": True,
-            })
-        else:
+        login_of = {p.id: p.email.strip().lower() for p in partners}
+        user_by_login = {u.login: u for u in Users.search([("login", "in", list(set(login_of.values())))])}
+
+        existing_users = Users
+        create_vals = {}
+        for partner in partners:
+            login = login_of[partner.id]
+            user = user_by_login.get(login)
+            if not user:
+                create_vals[login] = {
+                    "name": partner.name,
+                    "login": login,
+                    "email": login,
+                    "partner_id": partner.id,
+                    "groups_id": [(6, 0, [portal_group.id])],
+                    "active": True,
+                }
+                continue
+
+            vals = {}
             if user.partner_id.id != partner.id:
-                user.write({"partner_id": partner.id})
+                vals["partner_id"] = partner.id
             if portal_group.id not in user.groups_id.ids:
-                user.write({"groups_id": [(4, portal_group.id)]})
+                vals["groups_id"] = [(4, portal_group.id)]
             if not user.email:
-                user.write({"email": email})
-
-        try:
-            user.action_reset_password()
-        except Exception:
-            pass
-
-        partner = user.partner_id.sudo()
-        partner.signup_prepare()
-
+                vals["email"] = login
+            if vals:
+                user.write(vals)
+            existing_users |= user
+
+        new_users = Users
+        if create_vals:
+            new_users = Users.with_context(no_reset_password=True).create(list(create_vals.values()))
+
+        # same tokens as auth_signup: open-ended invitation for new users, 1-day reset link otherwise
+        new_users.mapped("partner_id").signup_prepare(signup_type="signup")
+        existing_users.mapped("partner_id").signup_prepare(
+            signup_type="reset", expiration=fields.Datetime.now() + timedelta(days=1)
+        )
+
+        errors = {}
+        errors.update(self._queue_signup_mails(new_users, "auth_signup.set_password_email"))
+        errors.update(self._queue_signup_mails(existing_users, "auth_signup.reset_password_email"))
+
+        signup_partners = (new_users | existing_users).mapped("partner_id").sudo()
         base_url = (self.env["ir.config_parameter"].sudo().get_param("web.base.url") or "").rstrip("/")
-        signup_url = "%s/web/signup?token=%s" % (base_url, partner.signup_token)
+        urls = {
+            p.id: "%s/web/signup?token=%s" % (base_url, p.signup_token)
+            for p in signup_partners
+        }
+        return urls, errors
 
-        return user, signup_url
+    def _queue_signup_mails(self, users, template_xmlid):
+        """
+        Queue the auth_signup invitation/reset template for each user (mail.mail, sent by the
+        mail queue cron). action_reset_password() can't be used: it does nothing under import_file
+        and force-sends otherwise. Returns {partner_id: error} for users whose mail failed.
+        """
+        errors = {}
+        template = self.env.ref(template_xmlid, raise_if_not_found=False)
+        if not template:
+            return dict.fromkeys(users.mapped("partner_id").ids, _("Email template %s not found.") % template_xmlid)
+
+        email_values = {
+            "email_cc": False,
+            "auto_delete": True,
+            "message_type": "user_notification",
+            "recipient_ids": [],
+            "partner_ids": [],
+            "scheduled_date": False,
+        }
+        for user in users:
+            try:
+                with self.env.cr.savepoint():
+                    template.sudo().with_context(lang=user.lang).send_mail(
+                        user.id,
+                        force_send=False,
+                        raise_exception=True,
+                        email_values=dict(email_values, email_to=user.email),
+                    )
+            except Exception as e:
+                _logger.warning("partner_attribution_v1: invitation email for user %s not queued: %s", user.login, e)
+                errors[user.partner_id.id] = str(e.args[0] if getattr(e, "args", None) else e)
+        return errors
 
     # ----------------------------
     # Sequences
     # ----------------------------
-    @api.model
-    def create(self, vals):
-        if vals.get("name") in (False, _("New"), "New"):
-            vals["name"] = self.env["ir.sequence"].next_by_code("partner.attribution.inquiry") or _("New")
-        return super().create(vals)
+    @api.model_create_multi
+    def create(self, vals_list):
+        for vals in vals_list:
+            if vals.get("name") in (False, None, _("New"), "New"):
+                vals["name"] = self.env["ir.sequence"].next_by_code("partner.attribution.inquiry") or _("New")
+        return super().create(vals_list)
 
     # ----------------------------
     # Website submit helper (NEW)
@@ -216,30 +294,140 @@ class PartnerAttributionInquiry(models.Model):
           - move inquiry -> enlisted (screening started)
         It must NOT block on strict approval requirements like documents.
         """
+        todo = self.filtered(lambda r: r.state not in ("approved", "rejected"))
+
+        # light checks only
+        todo._validate_admission(stage="enlist")
+
+        todo._ensure_crm_leads()
+
+        todo.filtered(lambda r: r.state == "inquiry").sudo().write({"state": "enlisted"})
+        return True
+
+    # ----------------------------
+    # Website background stage
+    # ----------------------------
+    def _find_open_duplicates(self):
+        """
+        Return the subset of self that duplicates an already open inquiry
+        (same email + role), or an earlier record of the same batch.
+        """
+        keys = {}
         for rec in self:
-            if rec.state in ("approved", "rejected"):
-                continue
+            if rec.dedupe_email:
+                keys.setdefault((rec.dedupe_email, rec.partner_role), []).append(rec.id)
+        if not keys:
+            return self.browse()
+
+        existing = self.sudo().search_read([
+            ("dedupe_email", "in", list({k[0] for k in keys})),
+            ("state", "in", ("inquiry", "enlisted")),
+            ("website_pending", "=", False),
+            ("id", "not in", self.ids),
+        ], ["dedupe_email", "partner_role"])
+        taken = {(r["dedupe_email"], r["partner_role"]) for r in existing}
+
+        dup_ids = []
+        for key, ids in keys.items():
+            if key in taken:
+                dup_ids.extend(ids)
+            else:
+                dup_ids.extend(sorted(ids)[1:])
+        return self.browse(dup_ids)
 
-            # light checks only
-            rec._validate_admission(stage="enlist")
+    def _process_website_batch(self):
+        """
+        Screening for inquiries inserted by /partners/apply/submit:
+        validation, duplicate check, CRM leads (one create) and enlistment.
+        The batch runs in a savepoint; if it fails, each inquiry is retried in its own
+        savepoint and a failing one is taken out of the queue with its error.
+        """
+        pending = self.sudo().filtered(lambda r: r.website_pending)
+        if not pending:
+            return True
 
-            rec._ensure_crm_lead()
+        try:
+            with self.env.cr.savepoint():
+                pending._screen_website_inquiries()
+        except Exception:
+            for rec in pending:
+                try:
+                    with self.env.cr.savepoint():
+                        rec._screen_website_inquiries()
+                except Exception as e:
+                    _logger.warning("partner_attribution_v1: website inquiry %s failed screening: %s", rec.name, e)
+                    rec.write({
+                        "website_pending": False,
+                        "website_error": str(e.args[0] if getattr(e, "args", None) else e),
+                    })
+        return True
 
-            if rec.state == "inquiry":
-                rec.sudo().write({"state": "enlisted"})
+    def _screen_website_inquiries(self):
+        """One set-wise screening pass over pending inquiries (see _process_website_batch)."""
+        pending = self
+        closed = pending.filtered(lambda r: r.state in ("approved", "rejected"))
+        pending -= closed
+
+        invalid = pending.browse()
+        errors = {}
+        for rec in pending:
+            try:
+                rec._validate_admission(stage="enlist")
+            except UserError as e:
+                invalid |= rec
+                errors[rec.id] = str(e.args[0] if e.args else e)
+        pending -= invalid
+
+        duplicates = pending._find_open_duplicates()
+        pending -= duplicates
+
+        pending._ensure_crm_leads()
+        pending.filtered(lambda r: r.state == "inquiry").write({"state": "enlisted"})
+
+        for rec in invalid:
+            rec.write({"state": "rejected", "website_error": errors[rec.id]})
+        if duplicates:
+            duplicates.write({
+                "state": "rejected",
+                "website_error": _("Duplicate of an open inquiry with the same email and role."),
+            })
+
+        (pending | closed | invalid | duplicates).write({"website_pending": False})
+
+    @api.model
+    def _process_website_inquiries(self, batch_size=200, auto_commit=False):
+        """
+        Process pending website inquiries in chunks, oldest first.
+        With auto_commit each processed chunk is committed, so a later failure keeps the earlier ones.
+        """
+        Inquiry = self.sudo()
+        last_ids = None
+        while True:
+            batch = Inquiry.search([("website_pending", "=", True)], order="id asc", limit=batch_size)
+            if not batch or batch.ids == last_ids:
+                break
+            last_ids = batch.ids
+            batch._process_website_batch()
+            if auto_commit:
+                self.env.cr.commit()
         return True
 
+    @api.model
+    def _cron_process_website_inquiries(self, batch_size=200):
+        """
+        Cron target: process pending website inquiries in committed chunks.
+        """
+        return self._process_website_inquiries(batch_size=batch_size, auto_commit=True)
+
     # ----------------------------
     # Actions (match view)
     # ----------------------------
     def action_enlist_partner(self):
         """Inquiry -> Enlisted, and create CRM Lead for screening."""
-        for rec in self:
-            if rec.state != "inquiry":
-                continue
-            rec._validate_admission(stage="enlist")
-            rec._ensure_crm_lead()
-            rec.sudo().write({"state": "enlisted"})
+        todo = self.filtered(lambda r: r.state == "inquiry")
+        todo._validate_admission(stage="enlist")
+        todo._ensure_crm_leads()
+        todo.sudo().write({"state": "enlisted", "website_pending": False})
         return True
 
     def action_open_lead(self):
@@ -275,65 +463,175 @@ class PartnerAttributionInquiry(models.Model):
             rec.sudo().write({"state": "rejected"})
         return True
 
-    def action_approve_partner(self):
-        Partner = self.env["res.partner"].sudo()
-
-        for rec in self:
-            if rec.state != "enlisted":
-                raise UserError(_("Only Enlisted inquiries can be Approved."))
-
-            # ✅ strict checks here
-            rec._validate_admission(stage="approve")
-
-            partner = False
-            if rec.email:
-                partner = Partner.search([("email", "=", (rec.email or "").strip())], limit=1)
-            if not partner and rec.phone:
-                partner = Partner.search([("phone", "=", (rec.phone or "").strip())], limit=1)
-
-            vals = {
-                "name": rec.applicant_name,
-                "email": (rec.email or "").strip() or False,
-                "phone": (rec.phone or "").strip() or False,
-                "company_type": "company" if rec.applicant_company else "person",
-                "comment": "\n".join(filter(None, [
-                    ("Company: %s" % rec.applicant_company) if rec.applicant_company else "",
-                    rec.note or "",
-                ])).strip() or False,
-            }
-            if "vat" in Partner._fields and rec.vat:
-                vals["vat"] = rec.vat
-
-            if partner:
-                partner.write(vals)
-            else:
-                partner = Partner.create(vals)
+    # ----------------------------
+    # Bulk approval pipeline
+    # ----------------------------
+    def _prepare_partner_vals(self):
+        self.ensure_one()
+        vals = {
+            "name": self.applicant_name,
+            "email": (self.email or "").strip() or False,
+            "phone": (self.phone or "").strip() or False,
+            "company_type": "company" if self.applicant_company else "person",
+            "comment": "\n".join(filter(None, [
+                ("Company: %s" % self.applicant_company) if self.applicant_company else "",
+                self.note or "",
+            ])).strip() or False,
+        }
+        if "vat" in self.env["res.partner"]._fields and self.vat:
+            vals["vat"] = self.vat
+        return vals
 
-            if rec.iban:
-                Bank = self.env["res.partner.bank"].sudo()
-                iban_clean = (rec.iban or "").replace(" ", "").upper()
-                existing = Bank.search([("partner_id", "=", partner.id), ("acc_number", "=", iban_clean)], limit=1)
-                if not existing:
-                    Bank.create({"partner_id": partner.id, "acc_number": iban_clean})
+    def _approve_enlisted_bulk(self):
+        """
+        Approve validated, enlisted inquiries set-wise:
+        partners, bank accounts and portal users are created with vals_lists.
+        Returns {inquiry_id: warning} for approved inquiries whose invitation email failed.
+        """
+        if not self:
+            return {}
 
-            if "partner_role" in partner._fields:
-                partner.write({"partner_role": rec.partner_role})
+        Partner = self.env["res.partner"].sudo()
+        Bank = self.env["res.partner.bank"].sudo()
+
+        # 1) Partners: reuse existing matches (one query) or an earlier applicant of the batch
+        matches = Partner._pa_v1_match_contacts([(rec.email, rec.phone) for rec in self])
+        partner_of = {}
+        new_vals, new_slot_of = [], {}
+        new_by_email, new_by_phone = {}, {}
+        for rec, matched in zip(self, matches):
+            vals = rec._prepare_partner_vals()
+            if matched:
+                matched.write(vals)
+                partner_of[rec.id] = matched
+                continue
 
-            if hasattr(partner, "action_approve_partner"):
-                partner.action_approve_partner()
+            slot = new_by_email.get(rec.dedupe_email) if rec.dedupe_email else None
+            if slot is None and rec.dedupe_phone:
+                slot = new_by_phone.get(rec.dedupe_phone)
+            if slot is None:
+                slot = len(new_vals)
+                new_vals.append(vals)
             else:
-                if "partner_state" in partner._fields:
-                    partner.write({"partner_state": "approved"})
+                new_vals[slot].update(vals)
+            if rec.dedupe_email:
+                new_by_email.setdefault(rec.dedupe_email, slot)
+            if rec.dedupe_phone:
+                new_by_phone.setdefault(rec.dedupe_phone, slot)
+            new_slot_of[rec.id] = slot
+
+        created = Partner.create(new_vals) if new_vals else Partner
+        for rec_id, slot in new_slot_of.items():
+            partner_of[rec_id] = created[slot]
+
+        partners = Partner.browse(list({p.id for p in partner_of.values()}))
+
+        # 2) Bank accounts: one search, one create
+        wanted = {
+            (partner_of[rec.id].id, rec.iban.replace(" ", "").upper())
+            for rec in self if rec.iban
+        }
+        if wanted:
+            existing = Bank.search([
+                ("partner_id", "in", list({pid for pid, _acc in wanted})),
+                ("acc_number", "in", list({acc for _pid, acc in wanted})),
+            ])
+            have = {(b.partner_id.id, b.acc_number) for b in existing}
+            missing = sorted(wanted - have)
+            if missing:
+                Bank.create([{"partner_id": pid, "acc_number": acc} for pid, acc in missing])
+
+        # 3) Roles (one write per role), then approval (sequence allocation)
+        by_role = {}
+        for rec in self:
+            by_role.setdefault(rec.partner_role, Partner)
+            by_role[rec.partner_role] |= partner_of[rec.id]
+        for role, role_partners in by_role.items():
+            role_partners.write({"partner_role": role})
+
+        partners.action_approve_partner()
 
+        # 4) Documents follow the partner
+        docs_by_partner = {}
+        for rec in self:
             if rec.attachment_ids:
-                rec.attachment_ids.sudo().write({"res_model": "res.partner", "res_id": partner.id})
+                pid = partner_of[rec.id].id
+                docs_by_partner[pid] = docs_by_partner.get(pid, rec.attachment_ids) | rec.attachment_ids
+        for pid, docs in docs_by_partner.items():
+            docs.sudo().write({"res_model": "res.partner", "res_id": pid})
 
-            _user, signup_url = rec._ensure_portal_user_and_link(partner)
+        # 5) Portal users (invitation emails queued)
+        urls, mail_errors = self._ensure_portal_users_and_links(partners)
 
+        warnings = {}
+        for rec in self:
+            partner = partner_of[rec.id]
+            if mail_errors.get(partner.id):
+                warnings[rec.id] = _("Approved, but the invitation email could not be queued: %s") % mail_errors[partner.id]
             rec.sudo().write({
                 "partner_id": partner.id,
-                "signup_url": signup_url,
+                "signup_url": urls.get(partner.id, False),
                 "state": "approved",
+                "approval_error": warnings.get(rec.id, False),
             })
+        return warnings
+
+    def _approve_partners_batch(self):
+        """
+        Approve inquiries in bulk and return a report {inquiry_id: False | error message}.
+        A failing application never stops the others; approved inquiries whose invitation
+        email could not be queued are reported with that warning.
+        """
+        report = {}
+        valid = self.browse()
+        for rec in self:
+            try:
+                if rec.state != "enlisted":
+                    raise UserError(_("Only Enlisted inquiries can be Approved."))
+                # ✅ strict checks here
+                rec._validate_admission(stage="approve")
+                valid |= rec
+            except UserError as e:
+                report[rec.id] = str(e.args[0] if e.args else e)
 
-        return True
\ No newline at end of file
+        try:
+            with self.env.cr.savepoint():
+                warnings = valid._approve_enlisted_bulk()
+            report.update({rec_id: warnings.get(rec_id, False) for rec_id in valid.ids})
+        except Exception:
+            # isolate the failing application(s); the rest is still approved
+            for rec in valid:
+                try:
+                    with self.env.cr.savepoint():
+                        warnings = rec._approve_enlisted_bulk()
+                    report[rec.id] = warnings.get(rec.id, False)
+                except Exception as e:
+                    report[rec.id] = str(e.args[0] if getattr(e, "args", None) else e)
+
+        for rec in self:
+            if report.get(rec.id):
+                rec.sudo().write({"approval_error": report[rec.id]})
+        return report
+
+    def action_approve_partner(self):
+        report = self._approve_partners_batch()
+        approved = self.filtered(lambda r: r.id in report and r.state == "approved")
+        failed = [msg for rec_id, msg in report.items() if msg and rec_id not in approved.ids]
+        unsent = [msg for rec_id, msg in report.items() if msg and rec_id in approved.ids]
+
+        if len(self) == 1 and failed:
+            raise UserError(failed[0])
+
+        return {
+            "type": "ir.actions.client",
+            "tag": "display_notification",
+            "params": {
+                "title": _("Inquiry Approval"),
+                "message": _("%(ok)s approved, %(ko)s failed, %(unsent)s invitation emails not queued "
+                             "(see Approval Error on the inquiries).")
+                % {"ok": len(report) - len(failed), "ko": len(failed), "unsent": len(unsent)},
+                "sticky": bool(failed or unsent),
+                "type": "warning" if failed or unsent else "success",
+                "next": {"type": "ir.actions.act_window_close"},
+            },
+        }
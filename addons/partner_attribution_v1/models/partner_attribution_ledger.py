@@ -2,6 +2,8 @@
 from odoo import api, fields, models, _
 from odoo.exceptions import UserError
 
+from .commercial_partner_backfill import _backfill_commercial_partner
+
 
 class PartnerAttributionLedger(models.Model):
     _name = "partner.attribution.ledger"
@@ -15,6 +17,14 @@ class PartnerAttributionLedger(models.Model):
     currency_id = fields.Many2one("res.currency", related="company_id.currency_id", store=True, readonly=True)
 
     partner_id = fields.Many2one("res.partner", string="Attributed Partner", required=True, index=True)
+    attributed_commercial_partner_id = fields.Many2one(
+        "res.partner",
+        string="Attributed Commercial Partner",
+        related="partner_id.commercial_partner_id",
+        store=True,
+        index=True,
+        readonly=True,
+    )
 
     invoice_id = fields.Many2one(
         "account.move",
@@ -38,10 +48,19 @@ class PartnerAttributionLedger(models.Model):
         index=True,
     )
 
-    # payout basis
+    # payout basis (company currency)
     commission_rate_used = fields.Float(string="Commission Rate Used (%)", readonly=True)
     commission_amount = fields.Monetary(string="Commission Amount (Signed)", readonly=True)
 
+    # transaction (invoice) currency amount and the rate used to convert it
+    transaction_currency_id = fields.Many2one("res.currency", string="Invoice Currency", readonly=True)
+    commission_amount_currency = fields.Monetary(
+        string="Commission Amount (Invoice Currency)",
+        currency_field="transaction_currency_id",
+        readonly=True,
+    )
+    conversion_rate = fields.Float(string="Conversion Rate", digits=0, readonly=True)
+
     state = fields.Selection(
         [("on_hold", "On Hold"), ("payable", "Payable"), ("paid", "Paid"), ("reversed", "Reversed")],
         string="Status",
@@ -72,12 +91,39 @@ class PartnerAttributionLedger(models.Model):
         copy=False,
     )
 
-    partner_kyc_status = fields.Selection(related="partner_id.kyc_status", store=True, readonly=True)
+    # refund lines: payout batch whose vendor bills netted this clawback
+    clawback_batch_id = fields.Many2one(
+        "partner.attribution.payout.batch",
+        string="Clawback Netted In",
+        index=True,
+        ondelete="set null",
+        readonly=True,
+        copy=False,
+    )
+
+    # copy of partner_id.kyc_status for search/group-by; synced off-request by a set-based
+    # SQL update (_sync_partner_kyc_status) instead of a stored related fan-out write
+    partner_kyc_status = fields.Selection(
+        selection=[
+            ("not_submitted", "Not Submitted"),
+            ("pending", "Pending Review"),
+            ("verified", "Verified"),
+            ("complete", "Complete"),
+            ("rejected", "Rejected"),
+        ],
+        string="Partner KYC Status",
+        readonly=True,
+        copy=False,
+    )
 
     _sql_constraints = [
         ("uniq_invoice_ledger", "unique(invoice_id)", "A ledger line already exists for this invoice/refund."),
     ]
 
+    def _auto_init(self):
+        _backfill_commercial_partner(self.env.cr, "partner_attribution_ledger", "partner_id")
+        return super()._auto_init()
+
     @api.depends("invoice_id", "partner_id", "entry_type")
     def _compute_display_name(self):
         for rec in self:
@@ -88,6 +134,47 @@ class PartnerAttributionLedger(models.Model):
                 rec.entry_type,
             )
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        partner_ids = {vals["partner_id"] for vals in vals_list if vals.get("partner_id") and "partner_kyc_status" not in vals}
+        statuses = {p.id: p.kyc_status for p in self.env["res.partner"].sudo().browse(list(partner_ids))}
+        for vals in vals_list:
+            if vals.get("partner_id") in statuses and "partner_kyc_status" not in vals:
+                vals["partner_kyc_status"] = statuses[vals["partner_id"]]
+        return super().create(vals_list)
+
+    @api.model
+    def _sync_partner_kyc_status(self, partner_ids=None):
+        """
+        Copy res.partner.kyc_status onto ledger lines in one UPDATE, touching only stale rows.
+        Runs from cron (triggered by KYC changes), never inside the user's request.
+        write_date is bumped so incremental consumers (BI snapshots) see the change.
+        """
+        self.env["res.partner"].flush_model(["kyc_status"])
+        self.flush_model(["partner_kyc_status"])
+        query = """
+            UPDATE partner_attribution_ledger l
+               SET partner_kyc_status = rp.kyc_status,
+                   write_date = (now() at time zone 'UTC')
+              FROM res_partner rp
+             WHERE rp.id = l.partner_id
+               AND l.partner_kyc_status IS DISTINCT FROM rp.kyc_status
+        """
+        params = ()
+        if partner_ids:
+            query += " AND l.partner_id = ANY(%s)"
+            params = (list(partner_ids),)
+        self.env.cr.execute(query, params)
+        updated = self.env.cr.rowcount
+        if updated:
+            self.invalidate_model(["partner_kyc_status", "write_date"])
+        return updated
+
+    @api.model
+    def _cron_sync_partner_kyc_status(self):
+        self.sudo()._sync_partner_kyc_status()
+        return True
+
     def unlink(self):
         raise UserError(_("Ledger lines are audit records and cannot be deleted."))
 
@@ -95,35 +182,128 @@ class PartnerAttributionLedger(models.Model):
         immutable = {
             "company_id", "partner_id", "invoice_id", "origin_invoice_id",
             "entry_type", "commission_rate_used", "commission_amount",
+            "transaction_currency_id", "commission_amount_currency", "conversion_rate",
             "invoice_paid_at", "created_at",
         }
         if immutable.intersection(vals.keys()):
             raise UserError(_("Ledger lines are audit records. Core fields cannot be edited."))
-        return super().write(vals)
+        if "state" not in vals:
+            return super().write(vals)
+
+        # every state transition goes to the outbox, whichever code path writes it
+        previous_states = {line.id: line.state for line in self}
+        res = super().write(vals)
+        self.filtered(lambda l: l.state != previous_states[l.id])._pa_v1_emit_events(
+            "ledger.state_changed", previous_states
+        )
+        return res
+
+    # ----------------------------
+    # Currency conversion (batched, cached per transaction)
+    # ----------------------------
+    @api.model
+    def _pa_v1_conversion_rates(self, keys):
+        """
+        Rates to convert into company currency for (currency_id, company_id, date) keys.
+        Missing keys are fetched with one res.currency._get_rates() call per (company, date)
+        and kept in a cursor-level cache shared by ledger creation and payout generation.
+        Returns {key: rate}.
+        """
+        cache = self.env.cr.cache.setdefault("pa_v1_currency_rates", {})
+        missing = {}
+        for key in set(keys):
+            if key not in cache:
+                currency_id, company_id, date = key
+                missing.setdefault((company_id, date), set()).add(currency_id)
+
+        Company = self.env["res.company"].sudo()
+        Currency = self.env["res.currency"].sudo()
+        for (company_id, date), currency_ids in missing.items():
+            company = Company.browse(company_id)
+            company_currency = company.currency_id
+            rates = Currency.browse(list(currency_ids | {company_currency.id}))._get_rates(company, date)
+            for currency_id in currency_ids:
+                if currency_id == company_currency.id or not rates.get(currency_id):
+                    cache[(currency_id, company_id, date)] = 1.0
+                else:
+                    cache[(currency_id, company_id, date)] = rates[company_currency.id] / rates[currency_id]
+
+        return {key: cache[key] for key in keys}
+
+    @api.model
+    def _pa_v1_rate_key(self, move):
+        return (move.currency_id.id, move.company_id.id, move.invoice_date or move.date or fields.Date.context_today(self))
+
+    def _pa_v1_company_amounts(self):
+        """
+        Commission per line in company currency ({ledger_id: amount}).
+        Lines created before amounts were stored in both currencies hold the invoice-currency
+        figure in commission_amount; those are converted with the shared rate cache.
+        """
+        legacy = self.filtered(
+            lambda l: not l.transaction_currency_id and l.invoice_id.currency_id != l.company_id.currency_id
+        )
+        rates = self._pa_v1_conversion_rates([self._pa_v1_rate_key(l.invoice_id) for l in legacy])
+        legacy_ids = set(legacy.ids)
+
+        amounts = {}
+        for line in self:
+            amount = line.commission_amount or 0.0
+            if line.id in legacy_ids:
+                amount = line.currency_id.round(amount * rates[self._pa_v1_rate_key(line.invoice_id)])
+            amounts[line.id] = amount
+        return amounts
+
+    def _pa_v1_emit_events(self, event_type, previous_states=None):
+        """Write one outbox event per line (same transaction as the change)."""
+        events = []
+        for line in self:
+            payload = {
+                "ledger_id": line.id,
+                "company_id": line.company_id.id,
+                "partner_id": line.partner_id.id,
+                "invoice_id": line.invoice_id.id,
+                "origin_invoice_id": line.origin_invoice_id.id or None,
+                "entry_type": line.entry_type,
+                "state": line.state,
+                "commission_amount": line.commission_amount,
+                "currency": line.currency_id.name,
+                "commission_amount_currency": line.commission_amount_currency,
+                "transaction_currency": line.transaction_currency_id.name,
+                "payout_batch_id": line.payout_batch_id.id or None,
+                "vendor_bill_id": line.vendor_bill_id.id or None,
+            }
+            if previous_states is not None:
+                payload["previous_state"] = previous_states.get(line.id)
+            events.append({
+                "event_type": event_type,
+                "res_model": self._name,
+                "res_id": line.id,
+                "company_id": line.company_id.id,
+                "payload": payload,
+            })
+        self.env["partner.attribution.event"].sudo()._emit(events)
 
     def action_recompute_payout_state(self):
+        # one write per target state (state changes are emitted to the outbox by write())
+        new_states = {}
         for line in self.sudo():
             # refund lines are always reversed
             if line.entry_type == "refund":
-                line.state = "reversed"
-                continue
-
+                state = "reversed"
             # nothing to pay
-            if not line.commission_amount or line.commission_amount <= 0:
-                line.state = "on_hold"
-                continue
-
+            elif not line.commission_amount or line.commission_amount <= 0:
+                state = "on_hold"
             # vendor bill paid => paid
-            if line.vendor_bill_id and line.vendor_bill_id.payment_state == "paid":
-                line.state = "paid"
-                continue
-
-            partner = line.partner_id
-            kyc_ok = partner.kyc_status in ("complete", "verified")
-            if (not kyc_ok) or partner.kyc_blocked or (not partner.bank_verified):
-                line.state = "on_hold"
-                continue
-
-            line.state = "payable"
+            elif line.vendor_bill_id and line.vendor_bill_id.payment_state == "paid":
+                state = "paid"
+            elif not line.partner_id.payout_eligible:
+                state = "on_hold"
+            else:
+                state = "payable"
+            if line.state != state:
+                new_states.setdefault(state, []).append(line.id)
 
+        for state, line_ids in new_states.items():
+            self.sudo().browse(line_ids).write({"state": state})
         return True
\ No newline at end of file
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+import csv
+import io
+import os
+import tempfile
+
+from odoo import api, fields, models, _
+from odoo.exceptions import UserError
+
+from .kyc_validation import _coc_check, _iban_check, _vat_check
+
+try:
+    import openpyxl
+except Exception:
+    openpyxl = None
+
+VALIDATION_CHUNK_SIZE = 1000
+# filestore storage only; the DB-storage path of _pa_v1_create_from_stream caps at 25MB
+RESULT_MAX_BYTES = 2 * 1024 * 1024 * 1024  # 2GB
+
+# accepted header aliases -> canonical column
+COLUMN_ALIASES = {
+    "name": "name",
+    "partner": "name",
+    "email": "email",
+    "iban": "iban",
+    "acc_number": "iban",
+    "bank_account": "iban",
+    "vat": "vat",
+    "vat_number": "vat",
+    "coc": "coc",
+    "coc_number": "coc",
+    "country": "country",
+    "country_code": "country",
+}
+
+RESULT_HEADER = ["row", "name", "email", "iban", "status", "errors"]
+
+
+class PartnerAttributionImportValidation(models.TransientModel):
+    _name = "partner.attribution.import.validation"
+    _description = "Partner Import KYC / Bank Validation"
+
+    import_file = fields.Binary(string="Import File (CSV/XLSX)", attachment=True, required=True)
+    import_filename = fields.Char(string="File Name")
+
+    state = fields.Selection([("draft", "Draft"), ("done", "Validated")], default="draft", required=True)
+    row_count = fields.Integer(string="Rows", readonly=True)
+    error_count = fields.Integer(string="Rows with Errors", readonly=True)
+    result_attachment_id = fields.Many2one("ir.attachment", string="Result File", readonly=True)
+
+    # ----------------------------
+    # Row streaming
+    # ----------------------------
+    def _open_import_file(self):
+        """Binary file object on the uploaded file, read from the filestore when possible."""
+        self.ensure_one()
+        att = self.env["ir.attachment"].sudo().search([
+            ("res_model", "=", self._name),
+            ("res_id", "=", self.id),
+            ("res_field", "=", "import_file"),
+        ], limit=1)
+        if not att:
+            raise UserError(_("Please upload a CSV or XLSX file first."))
+        if att.store_fname:
+            return open(att._full_path(att.store_fname), "rb")
+        return io.BytesIO(att.raw or b"")
+
+    @api.model
+    def _iter_rows(self, fileobj, filename):
+        """Yield one dict per data row (canonical column -> str), without loading the file."""
+        ext = (os.path.splitext(filename or "")[1] or "").lower()
+        if ext in (".xlsx", ".xlsm"):
+            rows = self._iter_xlsx_rows(fileobj)
+        else:
+            rows = self._iter_csv_rows(fileobj)
+
+        header = None
+        for values in rows:
+            if header is None:
+                header = [COLUMN_ALIASES.get((str(v or "")).strip().lower()) for v in values]
+                if "iban" not in header:
+                    raise UserError(_("The import file needs an IBAN column (iban / acc_number / bank_account)."))
+                continue
+            row = {}
+            for col, value in zip(header, values):
+                if col and value not in (None, ""):
+                    row[col] = str(value).strip()
+            if row:
+                yield row
+
+    @api.model
+    def _iter_csv_rows(self, fileobj):
+        text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+        sample = text.read(4096)
+        text.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+        except csv.Error:
+            dialect = csv.excel
+        yield from csv.reader(text, dialect)
+
+    @api.model
+    def _iter_xlsx_rows(self, fileobj):
+        if not openpyxl:
+            raise UserError(_("Reading XLSX files requires the Python package 'openpyxl'."))
+        workbook = openpyxl.load_workbook(fileobj, read_only=True, data_only=True)
+        try:
+            yield from workbook.active.iter_rows(values_only=True)
+        finally:
+            workbook.close()
+
+    # ----------------------------
+    # Validation engine
+    # ----------------------------
+    @api.model
+    def _validate_chunk(self, chunk, seen_ibans):
+        """
+        Validate a chunk of (row_number, row) pairs.
+        Existing bank accounts are looked up with one query per chunk.
+        """
+        checked = []
+        for row_no, row in chunk:
+            country = (row.get("country") or "")[:2]
+            iban, iban_err = _iban_check(row.get("iban"))
+            errors = []
+            if iban_err:
+                errors.append("iban:%s" % iban_err)
+            if row.get("vat"):
+                vat_err = _vat_check(row["vat"], country or iban[:2])
+                if vat_err:
+                    errors.append("vat:%s" % vat_err)
+            if row.get("coc"):
+                coc_err = _coc_check(row["coc"], country or iban[:2])
+                if coc_err:
+                    errors.append("coc:%s" % coc_err)
+            checked.append((row_no, row, iban, iban_err, errors))
+
+        ibans = list({iban for _no, _row, iban, iban_err, _e in checked if iban and not iban_err})
+        existing = {}
+        if ibans:
+            for rec in self.env["res.partner.bank"].sudo().search_read(
+                [("sanitized_acc_number", "in", ibans)], ["sanitized_acc_number", "partner_id"]
+            ):
+                existing.setdefault(rec["sanitized_acc_number"], rec["partner_id"] and rec["partner_id"][0])
+
+        results = []
+        for row_no, row, iban, iban_err, errors in checked:
+            if iban and not iban_err:
+                if iban in existing:
+                    errors.append("iban:exists(partner %s)" % existing[iban])
+                if iban in seen_ibans:
+                    errors.append("iban:duplicate_in_file(row %s)" % seen_ibans[iban])
+                else:
+                    seen_ibans[iban] = row_no
+            results.append([
+                row_no,
+                row.get("name", ""),
+                row.get("email", ""),
+                iban,
+                "error" if errors else "ok",
+                "; ".join(errors),
+            ])
+        return results
+
+    @api.model
+    def _validate_stream(self, rows, out):
+        """
+        Validate an iterable of row dicts and write one CSV result line per row to `out` (text file).
+        Only one chunk is kept in memory. Returns (row_count, error_count).
+        """
+        writer = csv.writer(out)
+        writer.writerow(RESULT_HEADER)
+
+        seen_ibans = {}
+        row_count = error_count = 0
+        chunk = []
+        # data starts on line 2 (line 1 is the header)
+        for row_no, row in enumerate(rows, start=2):
+            chunk.append((row_no, row))
+            if len(chunk) >= VALIDATION_CHUNK_SIZE:
+                results = self._validate_chunk(chunk, seen_ibans)
+                writer.writerows(results)
+                row_count += len(results)
+                error_count += sum(1 for r in results if r[4] == "error")
+                chunk = []
+        if chunk:
+            results = self._validate_chunk(chunk, seen_ibans)
+            writer.writerows(results)
+            row_count += len(results)
+            error_count += sum(1 for r in results if r[4] == "error")
+        return row_count, error_count
+
+    # ----------------------------
+    # Action
+    # ----------------------------
+    def action_validate(self):
+        self.ensure_one()
+        filename = self.import_filename or "import.csv"
+
+        with self._open_import_file() as src, tempfile.TemporaryFile() as tmp:
+            out = io.TextIOWrapper(tmp, encoding="utf-8", newline="")
+            row_count, error_count = self._validate_stream(self._iter_rows(src, filename), out)
+            out.flush()
+            tmp.seek(0)
+
+            # streamed back into the filestore (same path as portal uploads)
+            result = self.env["ir.attachment"].sudo()._pa_v1_create_from_stream(tmp, RESULT_MAX_BYTES, {
+                "name": "Validation - %s.csv" % os.path.splitext(filename)[0],
+                "mimetype": "text/csv",
+                "res_model": self._name,
+                "res_id": self.id,
+            })
+            out.detach()
+
+        self.write({
+            "state": "done",
+            "row_count": row_count,
+            "error_count": error_count,
+            "result_attachment_id": result.id,
+        })
+        return {
+            "type": "ir.actions.act_window",
+            "res_model": self._name,
+            "res_id": self.id,
+            "view_mode": "form",
+            "target": "new",
+        }
+
+    def action_download_result(self):
+        self.ensure_one()
+        if not self.result_attachment_id:
+            raise UserError(_("Run the validation first."))
+        return {
+            "type": "ir.actions.act_url",
+            "url": "/web/content/%s?download=true" % self.result_attachment_id.id,
+            "target": "self",
+        }
@@ -46,6 +46,31 @@ class PartnerAttributionPayoutBatch(models.Model):
         readonly=True,
     )
 
+    # one row per partner, filled at load/generate time (the form shows these, not the ledger rows)
+    summary_ids = fields.One2many(
+        "partner.attribution.payout.summary",
+        "batch_id",
+        string="Partner Summary",
+        readonly=True,
+        copy=False,
+    )
+    ledger_line_count = fields.Integer(compute="_compute_ledger_line_count")
+    generation_error = fields.Text(string="Posting Errors", readonly=True, copy=False)
+
+    # refund ledger lines netted against this batch's payables
+    clawback_line_ids = fields.One2many(
+        "partner.attribution.ledger",
+        "clawback_batch_id",
+        string="Clawbacks",
+        readonly=True,
+        copy=False,
+    )
+
+    @api.depends("summary_ids.line_count")
+    def _compute_ledger_line_count(self):
+        for batch in self:
+            batch.ledger_line_count = sum(batch.summary_ids.mapped("line_count"))
+
     @api.model
     def create(self, vals):
         if vals.get("name") in (False, _("New"), "New"):
@@ -113,6 +138,69 @@ class PartnerAttributionPayoutBatch(models.Model):
                 "or set company default payable account."
             ) % (partner.display_name,))
 
+    # ----------------------------
+    # Refund clawback netting
+    # ----------------------------
+    def _get_open_clawbacks(self, partner_ids):
+        """
+        Open clawback refund lines per partner, in one grouped query.
+        A refund line is open when it was not netted yet and the commission of its
+        origin invoice was already billed or sits in this batch.
+        Returns {partner_id: [refund_line_id, ...]} ordered oldest first.
+        """
+        self.ensure_one()
+        if not partner_ids:
+            return {}
+        self.env["partner.attribution.ledger"].flush_model()
+        self.env.cr.execute("""
+            SELECT r.partner_id, ARRAY_AGG(r.id ORDER BY r.id)
+              FROM partner_attribution_ledger r
+              JOIN partner_attribution_ledger o
+                ON o.invoice_id = r.origin_invoice_id
+               AND o.partner_id = r.partner_id
+             WHERE r.company_id = %s
+               AND r.entry_type = 'refund'
+               AND r.clawback_batch_id IS NULL
+               AND r.vendor_bill_id IS NULL
+               AND r.commission_amount < 0
+               AND r.partner_id = ANY(%s)
+               AND (o.vendor_bill_id IS NOT NULL OR o.payout_batch_id = %s)
+          GROUP BY r.partner_id
+        """, (self.company_id.id, list(partner_ids), self.id))
+        return dict(self.env.cr.fetchall())
+
+    def _apply_clawback_netting(self, payables):
+        """
+        Net open clawbacks against the partner's payable total for this batch.
+        Whole refund lines are consumed, oldest first, as long as the partner
+        total stays positive; the rest carries over to a later batch.
+        """
+        self.ensure_one()
+        Ledger = self.env["partner.attribution.ledger"].sudo()
+
+        payable_amounts = payables._pa_v1_company_amounts()
+        totals = {}
+        for line in payables:
+            totals[line.partner_id.id] = totals.get(line.partner_id.id, 0.0) + payable_amounts[line.id]
+
+        open_by_partner = self._get_open_clawbacks(list(totals))
+        refunds = Ledger.browse([rid for ids in open_by_partner.values() for rid in ids])
+        refund_amounts = refunds._pa_v1_company_amounts()
+
+        consumed = []
+        for partner_id, refund_ids in open_by_partner.items():
+            remaining = totals[partner_id]
+            for refund_id in refund_ids:
+                amount = abs(refund_amounts[refund_id])
+                if self.currency_id.compare_amounts(remaining - amount, 0.0) <= 0:
+                    break
+                remaining -= amount
+                consumed.append(refund_id)
+
+        if consumed:
+            Ledger.browse(consumed).write({"clawback_batch_id": self.id})
+        return True
+
     # ----------------------------
     # Actions
     # ----------------------------
@@ -126,24 +214,28 @@ class PartnerAttributionPayoutBatch(models.Model):
             # refresh current batch lines
             if batch.ledger_line_ids:
                 batch.ledger_line_ids.sudo().write({"payout_batch_id": False})
+            if batch.clawback_line_ids:
+                batch.clawback_line_ids.sudo().write({"clawback_batch_id": False})
 
-            candidates = Ledger.search([
+            candidate_domain = [
                 ("company_id", "=", batch.company_id.id),
                 ("entry_type", "=", "invoice"),
                 ("vendor_bill_id", "=", False),
                 ("state", "in", ["on_hold", "payable"]),
                 ("payout_batch_id", "=", False),
+            ]
+            # eligibility is a stored partner flag: filtered in SQL through the partner join
+            payables = Ledger.search(candidate_domain + [
+                ("commission_amount", ">", 0.0),
+                ("partner_id.payout_eligible", "=", True),
             ])
-
-            if candidates:
-                candidates.action_recompute_payout_state()
-
-            payables = candidates.filtered(lambda l: l.state == "payable" and (l.commission_amount or 0.0) > 0.0)
             if payables:
-                payables.sudo().write({"payout_batch_id": batch.id})
+                payables.write({"state": "payable", "payout_batch_id": batch.id})
+                batch._apply_clawback_netting(payables)
+                self.env["partner.attribution.payout.summary"]._rebuild_for_batches(batch)
                 continue  # do NOT return early; allow multi-record batches
 
-            on_hold = candidates.filtered(lambda l: l.state == "on_hold")
+            candidates_count = Ledger.search_count(candidate_domain)
             already_billed = Ledger.search_count([
                 ("company_id", "=", batch.company_id.id),
                 ("entry_type", "=", "invoice"),
@@ -152,8 +244,7 @@ class PartnerAttributionPayoutBatch(models.Model):
 
             raise UserError(_(
                 "No PAYABLE ledger lines found.\n\n"
-                "Candidates checked: %s\n"
-                "Still ON HOLD after recompute: %s\n"
+                "Candidates checked (none eligible with positive commission): %s\n"
                 "Already billed (vendor_bill linked): %s\n\n"
                 "Most common causes:\n"
                 "- Invoice is not fully PAID (ledger not created)\n"
@@ -162,11 +253,35 @@ class PartnerAttributionPayoutBatch(models.Model):
                 "- Partner bank_verified is False\n"
                 "- Partner is KYC blocked\n"
                 "- Commission amount is 0\n"
-            ) % (len(candidates), len(on_hold), already_billed))
+            ) % (candidates_count, already_billed))
 
         return True
 
+    def _post_vendor_bills(self, bills):
+        """
+        Post all bills in one action_post(); when that fails, retry bill by bill
+        (savepoint each) so one bad bill does not block the others.
+        Returns {bill_id: error message} for the bills left in draft.
+        """
+        errors = {}
+        if not bills:
+            return errors
+        try:
+            with self.env.cr.savepoint():
+                bills.action_post()
+        except Exception:
+            for bill in bills:
+                try:
+                    with self.env.cr.savepoint():
+                        bill.action_post()
+                except Exception as e:
+                    errors[bill.id] = str(e.args[0] if getattr(e, "args", None) else e)
+        return errors
+
     def action_generate_vendor_bills(self):
+        Ledger = self.env["partner.attribution.ledger"].sudo()
+        Move = self.env["account.move"].sudo()
+
         for batch in self:
             if batch.state != "draft":
                 continue
@@ -174,50 +289,50 @@ class PartnerAttributionPayoutBatch(models.Model):
             if not batch.ledger_line_ids:
                 raise UserError(_("No payable ledger lines loaded. Click 'Load Payables' first."))
 
-            batch.ledger_line_ids.action_recompute_payout_state()
-
-            lines_all = batch.ledger_line_ids.filtered(
-                lambda l: l.state == "payable" and (l.commission_amount or 0.0) > 0.0
-            )
+            batch_domain = [
+                ("payout_batch_id", "=", batch.id),
+                ("entry_type", "=", "invoice"),
+                ("vendor_bill_id", "=", False),
+            ]
+            if Ledger.search_count(batch_domain + [("partner_id.payout_eligible", "=", False)]):
+                raise UserError(_(
+                    "Some partners are no longer eligible for payout "
+                    "(KYC verified/complete, not KYC-blocked, bank verified). Vendor bills cannot be generated."
+                ))
+
+            lines_all = Ledger.search(batch_domain + [("commission_amount", ">", 0.0)])
             if not lines_all:
                 raise UserError(_("No PAYABLE ledger lines with positive commission found."))
 
-            bad = lines_all.filtered(lambda l: l.partner_id.kyc_status not in ("verified", "complete"))
-            if bad:
-                raise UserError(_("Some lines are not KYC verified/complete. Vendor bills cannot be generated."))
-
-            blocked = lines_all.filtered(lambda l: l.partner_id.kyc_blocked)
-            if blocked:
-                raise UserError(_("Some partners are KYC-blocked. Vendor bills cannot be generated."))
-
-            unverified_bank = lines_all.filtered(lambda l: not l.partner_id.bank_verified)
-            if unverified_bank:
-                raise UserError(_("Some partners do not have Bank Verified. Vendor bills cannot be generated."))
-
             product = batch._get_commission_product()
             journal = batch._get_vendor_bill_journal(batch.company_id)
             expense_acc = batch._get_expense_account(batch.company_id)
 
-            by_partner = {}
-            for line in lines_all:
-                by_partner.setdefault(line.partner_id.id, self.env["partner.attribution.ledger"])
-                by_partner[line.partner_id.id] |= line
+            # one grouped query: partner -> ledger ids (payables and netted clawbacks)
+            groups = Ledger._read_group(
+                [("id", "in", (lines_all | batch.clawback_line_ids).ids)],
+                groupby=["partner_id"],
+                aggregates=["id:array_agg"],
+            )
 
-            Move = self.env["account.move"].sudo()
+            # company-currency amounts, converted once for the whole batch
+            amounts = (lines_all | batch.clawback_line_ids)._pa_v1_company_amounts()
+            today = fields.Date.context_today(self)
 
-            for _partner_id, lines in by_partner.items():
-                partner = lines[0].partner_id
+            vals_list = []
+            bill_lines = []  # [(partner, ledger ids, total)] aligned with vals_list
+            for partner, ledger_ids in groups:
                 batch._precheck_vendor_bill_config(partner, batch.company_id, journal)
 
-                total = sum(lines.mapped("commission_amount")) or 0.0
+                total = batch.currency_id.round(sum(amounts[lid] for lid in ledger_ids)) or 0.0
                 if total <= 0.0:
                     continue
 
-                bill = Move.create({
+                vals_list.append({
                     "move_type": "in_invoice",
                     "partner_id": partner.id,
                     "company_id": batch.company_id.id,
-                    "invoice_date": fields.Date.context_today(self),
+                    "invoice_date": today,
                     "ref": batch.name,
                     "partner_payout_batch_id": batch.id,
                     "journal_id": journal.id,
@@ -229,23 +344,47 @@ class PartnerAttributionPayoutBatch(models.Model):
                         "account_id": expense_acc.id,
                     })],
                 })
-
-                try:
-                    bill.action_post()
-                except Exception:
-                    pass
-
-                lines.sudo().write({"vendor_bill_id": bill.id})
-
+                bill_lines.append((partner, sorted(ledger_ids), total))
+
+            # clawbacks of partners without a bill go back to the open pool (netted by a later batch)
+            billed_partner_ids = {partner.id for partner, _ids, _total in bill_lines}
+            released = batch.clawback_line_ids.filtered(lambda l: l.partner_id.id not in billed_partner_ids)
+            if released:
+                released.write({"clawback_batch_id": False})
+
+            bills = Move.create(vals_list)
+            post_errors = batch._post_vendor_bills(bills)
+
+            # link ledger -> bill with one mapping UPDATE instead of one write per bill
+            ledger_ids_map, bill_ids_map = [], []
+            for bill, (_partner, ledger_ids, _total) in zip(bills, bill_lines):
+                ledger_ids_map.extend(ledger_ids)
+                bill_ids_map.extend([bill.id] * len(ledger_ids))
+            if ledger_ids_map:
+                Ledger.flush_model(["vendor_bill_id"])
+                self.env.cr.execute("""
+                    UPDATE partner_attribution_ledger l
+                       SET vendor_bill_id = m.bill_id,
+                           write_uid = %s,
+                           write_date = (now() at time zone 'UTC')
+                      FROM (SELECT UNNEST(%s::int[]) AS ledger_id, UNNEST(%s::int[]) AS bill_id) m
+                     WHERE l.id = m.ledger_id
+                """, (self.env.uid, ledger_ids_map, bill_ids_map))
+                Ledger.invalidate_model(["vendor_bill_id", "write_uid", "write_date"])
+
+            attachments = []
+            for bill, (partner, ledger_ids, total) in zip(bills, bill_lines):
                 content = "\n".join([
                     "Payout Batch: %s" % batch.name,
                     "Partner: %s" % partner.display_name,
                     "Lines:",
-                    *["- %s = %s" % (l.display_name, l.commission_amount) for l in lines],
+                    *[
+                        "- %s = %s%s" % (l.display_name, amounts[l.id], " (clawback)" if l.entry_type == "refund" else "")
+                        for l in Ledger.browse(ledger_ids)
+                    ],
                     "TOTAL = %s" % total,
                 ]).encode("utf-8")
-
-                self.env["ir.attachment"].sudo().create({
+                attachments.append({
                     "name": "Payout Statement - %s - %s.txt" % (batch.name, partner.display_name),
                     "type": "binary",
                     "datas": base64.b64encode(content),
@@ -253,12 +392,60 @@ class PartnerAttributionPayoutBatch(models.Model):
                     "res_id": bill.id,
                     "mimetype": "text/plain",
                 })
+            self.env["ir.attachment"].sudo().create(attachments)
+
+            self.env["partner.attribution.event"].sudo()._emit([{
+                "event_type": "payout.vendor_bill_generated",
+                "res_model": "account.move",
+                "res_id": bill.id,
+                "company_id": batch.company_id.id,
+                "payload": {
+                    "vendor_bill_id": bill.id,
+                    "payout_batch_id": batch.id,
+                    "payout_batch": batch.name,
+                    "partner_id": partner.id,
+                    "amount": total,
+                    "currency": batch.currency_id.name,
+                    "ledger_ids": ledger_ids,
+                    "posted": bill.id not in post_errors,
+                },
+            } for bill, (partner, ledger_ids, total) in zip(bills, bill_lines)])
+
+            batch.generation_error = "\n".join(
+                "%s: %s" % (bill.partner_id.display_name, post_errors[bill.id]) for bill in bills if bill.id in post_errors
+            ) or False
 
             batch.state = "generated"
             batch.ledger_line_ids.action_recompute_payout_state()
-
+            self.env["partner.attribution.payout.summary"]._rebuild_for_batches(batch)
+
+        failed = self.filtered("generation_error")
+        if failed:
+            return {
+                "type": "ir.actions.client",
+                "tag": "display_notification",
+                "params": {
+                    "title": _("Vendor Bills"),
+                    "message": _("Some vendor bills could not be posted and were left in draft (see Posting Errors on the batch)."),
+                    "sticky": True,
+                    "type": "warning",
+                    "next": {"type": "ir.actions.client", "tag": "soft_reload"},
+                },
+            }
         return True
 
+    def action_open_ledger_lines(self):
+        """Drill-down to every ledger line of the batch (not loaded with the form)."""
+        self.ensure_one()
+        return {
+            "type": "ir.actions.act_window",
+            "name": _("Ledger Lines - %s") % self.name,
+            "res_model": "partner.attribution.ledger",
+            "view_mode": "tree,form",
+            "domain": ["|", ("payout_batch_id", "=", self.id), ("clawback_batch_id", "=", self.id)],
+            "context": {"create": False},
+        }
+
     def action_sync_paid_status(self):
         for batch in self:
             if not batch.vendor_bill_ids:
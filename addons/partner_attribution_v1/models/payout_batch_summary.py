@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+from odoo import api, fields, models, _
+
+
+class PartnerAttributionPayoutSummary(models.Model):
+    _name = "partner.attribution.payout.summary"
+    _description = "Partner Payout Batch Summary"
+    _order = "batch_id, net_amount desc, id"
+    _rec_name = "partner_id"
+
+    batch_id = fields.Many2one(
+        "partner.attribution.payout.batch",
+        string="Payout Batch",
+        required=True,
+        index=True,
+        ondelete="cascade",
+    )
+    partner_id = fields.Many2one("res.partner", string="Partner", required=True, index=True, readonly=True)
+    company_id = fields.Many2one(related="batch_id.company_id", readonly=True)
+    currency_id = fields.Many2one(related="batch_id.currency_id", readonly=True)
+
+    line_count = fields.Integer(string="Lines", readonly=True)
+    commission_amount = fields.Monetary(string="Commission", currency_field="currency_id", readonly=True)
+    clawback_amount = fields.Monetary(string="Clawback", currency_field="currency_id", readonly=True)
+    net_amount = fields.Monetary(string="Net Payout", currency_field="currency_id", readonly=True)
+
+    vendor_bill_id = fields.Many2one("account.move", string="Vendor Bill", readonly=True)
+    payment_state = fields.Selection(related="vendor_bill_id.payment_state", store=True, readonly=True)
+
+    _sql_constraints = [
+        ("uniq_batch_partner", "unique(batch_id, partner_id)", "One summary line per partner and batch."),
+    ]
+
+    def action_open_ledger_lines(self):
+        """Drill-down: the ledger lines behind this summary, loaded on demand."""
+        self.ensure_one()
+        return {
+            "type": "ir.actions.act_window",
+            "name": _("Ledger Lines - %s") % self.partner_id.display_name,
+            "res_model": "partner.attribution.ledger",
+            "view_mode": "tree,form",
+            "domain": [
+                ("partner_id", "=", self.partner_id.id),
+                "|",
+                ("payout_batch_id", "=", self.batch_id.id),
+                ("clawback_batch_id", "=", self.batch_id.id),
+            ],
+            "context": {"create": False},
+        }
+
+    @api.model
+    def _rebuild_for_batches(self, batches):
+        """
+        Replace the summaries of `batches` from their loaded ledger and clawback lines.
+        Amounts use the company-currency helper so legacy lines are converted once.
+        """
+        if not batches:
+            return self.browse()
+        self.sudo().search([("batch_id", "in", batches.ids)]).unlink()
+
+        vals_list = []
+        for batch in batches:
+            lines = batch.ledger_line_ids
+            refunds = batch.clawback_line_ids
+            amounts = (lines | refunds)._pa_v1_company_amounts()
+
+            by_partner = {}
+            for line in lines:
+                data = by_partner.setdefault(line.partner_id.id, {
+                    "line_count": 0, "commission_amount": 0.0, "clawback_amount": 0.0, "vendor_bill_id": False,
+                })
+                data["line_count"] += 1
+                data["commission_amount"] += amounts[line.id]
+                data["vendor_bill_id"] = data["vendor_bill_id"] or line.vendor_bill_id.id
+            for refund in refunds:
+                data = by_partner.setdefault(refund.partner_id.id, {
+                    "line_count": 0, "commission_amount": 0.0, "clawback_amount": 0.0, "vendor_bill_id": False,
+                })
+                data["line_count"] += 1
+                data["clawback_amount"] += amounts[refund.id]
+
+            round_ = batch.currency_id.round
+            for partner_id, data in by_partner.items():
+                vals_list.append({
+                    "batch_id": batch.id,
+                    "partner_id": partner_id,
+                    "line_count": data["line_count"],
+                    "commission_amount": round_(data["commission_amount"]),
+                    "clawback_amount": round_(data["clawback_amount"]),
+                    "net_amount": round_(data["commission_amount"] + data["clawback_amount"]),
+                    "vendor_bill_id": data["vendor_bill_id"],
+                })
+        return self.sudo().create(vals_list)
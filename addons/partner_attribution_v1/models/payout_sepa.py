@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import itertools
+import re
+import tempfile
+import unicodedata
+from xml.sax.saxutils import escape, quoteattr
+
+from odoo import api, fields, models, _
+from odoo.exceptions import UserError
+
+from .kyc_validation import _iban_check
+
+SEPA_READ_CHUNK = 1000
+SEPA_COPY_CHUNK = 64 * 1024
+SEPA_DEFAULT_MAX_TRANSACTIONS = 5000
+SEPA_DEFAULT_MAX_BYTES = 20 * 1024 * 1024  # 20MB, below common bank upload limits
+SEPA_ATTACHMENT_MAX_BYTES = 2 * 1024 * 1024 * 1024  # 2GB
+
+PAIN_NAMESPACE = "urn:iso:std:iso:20022:tech:xsd:pain.001.001.03"
+
+# SEPA basic Latin character set; anything else becomes a space
+_SEPA_CHARS_RE = re.compile(r"[^A-Za-z0-9/\-?:().,'+ ]")
+_BIC_RE = re.compile(r"^[A-Z]{6}[A-Z0-9]{2}([A-Z0-9]{3})?$")
+
+
+def _sepa_text(value, size):
+    value = unicodedata.normalize("NFKD", value or "").encode("ascii", "ignore").decode("ascii")
+    return escape(" ".join(_SEPA_CHARS_RE.sub(" ", value).split())[:size])
+
+
+def _sepa_bic(bic):
+    bic = re.sub(r"\s+", "", bic or "").upper()
+    return bic if _BIC_RE.match(bic) else False
+
+
+def _sepa_amount(cents):
+    return "%d.%02d" % divmod(cents, 100)
+
+
+class PartnerAttributionPayoutBatchSepa(models.Model):
+    _inherit = "partner.attribution.payout.batch"
+
+    sepa_attachment_ids = fields.Many2many(
+        "ir.attachment",
+        "partner_attribution_payout_batch_sepa_rel",
+        "batch_id",
+        "attachment_id",
+        string="SEPA Files",
+        readonly=True,
+        copy=False,
+    )
+    sepa_error = fields.Text(string="SEPA Skipped Bills", readonly=True, copy=False)
+
+    # ----------------------------
+    # Configuration
+    # ----------------------------
+    def _get_sepa_limits(self):
+        """(max transfers, max bytes) per file, from ir.config_parameter."""
+        ICP = self.env["ir.config_parameter"].sudo()
+        max_tx = int(ICP.get_param("partner_attribution_v1.sepa_max_transactions", SEPA_DEFAULT_MAX_TRANSACTIONS) or 0)
+        max_bytes = int(ICP.get_param("partner_attribution_v1.sepa_max_bytes", SEPA_DEFAULT_MAX_BYTES) or 0)
+        return max_tx or SEPA_DEFAULT_MAX_TRANSACTIONS, max_bytes or SEPA_DEFAULT_MAX_BYTES
+
+    def _get_sepa_debtor_account(self, company):
+        """Company bank account paying out: journal from config, else the first bank journal with an IBAN."""
+        Journal = self.env["account.journal"].sudo()
+        param = self.env["ir.config_parameter"].sudo().get_param("partner_attribution_v1.sepa_journal_id")
+        journal = Journal.browse(int(param)).exists() if param else Journal
+        if not journal:
+            journal = Journal.search([
+                ("company_id", "=", company.id),
+                ("type", "=", "bank"),
+                ("bank_account_id", "!=", False),
+            ], limit=1)
+        account = journal.bank_account_id
+        iban, err = _iban_check(account.acc_number)
+        if not account or err:
+            raise UserError(_(
+                "No valid company IBAN found for SEPA payouts. Set a bank account on a bank journal "
+                "(or the system parameter partner_attribution_v1.sepa_journal_id)."
+            ))
+        return iban, _sepa_bic(account.bank_id.bic)
+
+    # ----------------------------
+    # Transfers (bulk reads, bulk IBAN checks)
+    # ----------------------------
+    def _iter_sepa_transfers(self, errors):
+        """
+        Yield one transfer dict per open posted vendor bill of the batch not yet in a SEPA file.
+        Bills are read in chunks; creditor accounts come from one res.partner.bank query per chunk.
+        Bills that cannot be paid by SEPA are skipped and described in `errors`.
+        """
+        self.ensure_one()
+        Move = self.env["account.move"].sudo()
+        Bank = self.env["res.partner.bank"].sudo()
+        domain = [
+            ("partner_payout_batch_id", "=", self.id),
+            ("move_type", "=", "in_invoice"),
+            ("state", "=", "posted"),
+            ("payment_state", "in", ("not_paid", "partial")),
+            ("partner_payout_sepa_attachment_id", "=", False),
+        ]
+        last_id = 0
+        while True:
+            bills = Move.search_read(
+                domain + [("id", ">", last_id)],
+                ["name", "ref", "partner_id", "partner_bank_id", "currency_id", "amount_residual"],
+                order="id",
+                limit=SEPA_READ_CHUNK,
+            )
+            if not bills:
+                break
+            last_id = bills[-1]["id"]
+
+            partner_ids = list({b["partner_id"][0] for b in bills if b["partner_id"]})
+            bill_bank_ids = [b["partner_bank_id"][0] for b in bills if b["partner_bank_id"]]
+            accounts = {}
+            default_account = {}
+            for rec in Bank.search_read(
+                ["|", ("id", "in", bill_bank_ids), ("partner_id", "in", partner_ids)],
+                ["acc_number", "acc_holder_name", "bank_bic", "partner_id"],
+                order="sequence, id",
+            ):
+                accounts[rec["id"]] = rec
+                if rec["partner_id"]:
+                    default_account.setdefault(rec["partner_id"][0], rec)
+            currencies = {
+                c.id: c.name for c in self.env["res.currency"].browse({b["currency_id"][0] for b in bills})
+            }
+
+            for bill in bills:
+                partner_name = bill["partner_id"][1] if bill["partner_id"] else ""
+                if currencies[bill["currency_id"][0]] != "EUR":
+                    errors.append(_("%s (%s): currency is not EUR") % (bill["name"], partner_name))
+                    continue
+                account = (
+                    accounts.get(bill["partner_bank_id"][0]) if bill["partner_bank_id"]
+                    else default_account.get(bill["partner_id"][0]) if bill["partner_id"] else None
+                )
+                iban, err = _iban_check(account and account["acc_number"])
+                if err:
+                    errors.append(_("%s (%s): IBAN %s") % (bill["name"], partner_name, err))
+                    continue
+                cents = int(round(bill["amount_residual"] * 100))
+                if cents <= 0:
+                    continue
+                yield {
+                    "bill_id": bill["id"],
+                    "end_to_end_id": _sepa_text(bill["name"], 35),
+                    "cents": cents,
+                    "name": _sepa_text(account["acc_holder_name"] or partner_name, 70),
+                    "iban": iban,
+                    "bic": _sepa_bic(account["bank_bic"]),
+                    "remittance": _sepa_text("%s %s" % (bill["ref"] or self.name, bill["name"]), 140),
+                }
+
+    @api.model
+    def _sepa_transfer_xml(self, tx):
+        agent = (
+            "<CdtrAgt><FinInstnId><BIC>%s</BIC></FinInstnId></CdtrAgt>" % tx["bic"] if tx["bic"] else ""
+        )
+        return (
+            "<CdtTrfTxInf>"
+            "<PmtId><EndToEndId>%s</EndToEndId></PmtId>"
+            "<Amt><InstdAmt Ccy=\"EUR\">%s</InstdAmt></Amt>"
+            "%s"
+            "<Cdtr><Nm>%s</Nm></Cdtr>"
+            "<CdtrAcct><Id><IBAN>%s</IBAN></Id></CdtrAcct>"
+            "<RmtInf><Ustrd>%s</Ustrd></RmtInf>"
+            "</CdtTrfTxInf>\n"
+        ) % (tx["end_to_end_id"], _sepa_amount(tx["cents"]), agent, tx["name"], tx["iban"], tx["remittance"])
+
+    # ----------------------------
+    # Files
+    # ----------------------------
+    def _write_sepa_file(self, body, part, count, cents, debtor, execution_date):
+        """
+        Wrap the transfers spooled in `body` (binary temp file) with the group / payment
+        headers, stream the result into the filestore and return the attachment.
+        """
+        self.ensure_one()
+        iban, bic = debtor
+        msg_id = _sepa_text("%s-%s-%s" % (self.name, fields.Datetime.now().strftime("%Y%m%d%H%M%S"), part), 35)
+        company_name = _sepa_text(self.company_id.name, 70)
+        agent = (
+            "<BIC>%s</BIC>" % bic if bic else "<Othr><Id>NOTPROVIDED</Id></Othr>"
+        )
+        header = (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            "<Document xmlns=%s xmlns:xsi=\"http://www.w3.org/2001/XMLSchema-instance\">\n"
+            "<CstmrCdtTrfInitn>\n"
+            "<GrpHdr><MsgId>%s</MsgId><CreDtTm>%s</CreDtTm><NbOfTxs>%s</NbOfTxs><CtrlSum>%s</CtrlSum>"
+            "<InitgPty><Nm>%s</Nm></InitgPty></GrpHdr>\n"
+            "<PmtInf><PmtInfId>%s</PmtInfId><PmtMtd>TRF</PmtMtd><BtchBookg>true</BtchBookg>"
+            "<NbOfTxs>%s</NbOfTxs><CtrlSum>%s</CtrlSum>"
+            "<PmtTpInf><SvcLvl><Cd>SEPA</Cd></SvcLvl></PmtTpInf>"
+            "<ReqdExctnDt>%s</ReqdExctnDt>"
+            "<Dbtr><Nm>%s</Nm></Dbtr>"
+            "<DbtrAcct><Id><IBAN>%s</IBAN></Id></DbtrAcct>"
+            "<DbtrAgt><FinInstnId>%s</FinInstnId></DbtrAgt>"
+            "<ChrgBr>SLEV</ChrgBr>\n"
+        ) % (
+            quoteattr(PAIN_NAMESPACE), msg_id, fields.Datetime.now().strftime("%Y-%m-%dT%H:%M:%S"),
+            count, _sepa_amount(cents), company_name,
+            msg_id, count, _sepa_amount(cents), execution_date,
+            company_name, iban, agent,
+        )
+        footer = "</PmtInf>\n</CstmrCdtTrfInitn>\n</Document>\n"
+
+        with tempfile.TemporaryFile() as out:
+            sha = hashlib.sha1()
+            size = 0
+            body.seek(0)
+            for chunk in itertools.chain([header.encode("utf-8")], iter(lambda: body.read(SEPA_COPY_CHUNK), b""),
+                                         [footer.encode("utf-8")]):
+                sha.update(chunk)
+                size += len(chunk)
+                out.write(chunk)
+            out.seek(0)
+            attachment = self.env["ir.attachment"].sudo()._pa_v1_create_from_stream(out, SEPA_ATTACHMENT_MAX_BYTES, {
+                "name": "SEPA - %s - part %s.xml" % (self.name, part),
+                "mimetype": "application/xml",
+                "res_model": self._name,
+                "res_id": self.id,
+            })
+
+        # bills are only marked as exported against a file whose stored content is verified
+        if attachment.checksum != sha.hexdigest() or attachment.file_size != size:
+            raise UserError(_("The SEPA file %s could not be stored correctly; no bill was marked as exported.") % attachment.name)
+        return attachment
+
+    def action_generate_sepa_files(self):
+        """
+        Build pain.001.001.03 credit-transfer files, one transfer per open vendor bill.
+        Transfers are spooled to a temp file as they are rendered; a file is closed and a new
+        one started when the transfer count or size limit is reached.
+        """
+        for batch in self:
+            if batch.state == "draft":
+                raise UserError(_("Generate the vendor bills before the SEPA files."))
+
+            debtor = batch._get_sepa_debtor_account(batch.company_id)
+            max_tx, max_bytes = batch._get_sepa_limits()
+            execution_date = fields.Date.to_string(fields.Date.context_today(batch))
+            part = len(batch.sepa_attachment_ids)
+            errors = []
+            attachments = self.env["ir.attachment"]
+            bill_ids_map, attachment_ids_map = [], []
+
+            body = tempfile.TemporaryFile()
+            try:
+                count = cents = size = 0
+                file_bill_ids = []
+                for tx in batch._iter_sepa_transfers(errors):
+                    chunk = batch._sepa_transfer_xml(tx).encode("utf-8")
+                    if count and (count >= max_tx or size + len(chunk) > max_bytes):
+                        part += 1
+                        att = batch._write_sepa_file(body, part, count, cents, debtor, execution_date)
+                        attachments |= att
+                        bill_ids_map.extend(file_bill_ids)
+                        attachment_ids_map.extend([att.id] * len(file_bill_ids))
+                        body.seek(0)
+                        body.truncate()
+                        count = cents = size = 0
+                        file_bill_ids = []
+                    body.write(chunk)
+                    count += 1
+                    cents += tx["cents"]
+                    size += len(chunk)
+                    file_bill_ids.append(tx["bill_id"])
+                if count:
+                    part += 1
+                    att = batch._write_sepa_file(body, part, count, cents, debtor, execution_date)
+                    attachments |= att
+                    bill_ids_map.extend(file_bill_ids)
+                    attachment_ids_map.extend([att.id] * len(file_bill_ids))
+            finally:
+                body.close()
+
+            # bill -> SEPA file with one mapping UPDATE (exported bills are skipped on the next run)
+            if bill_ids_map:
+                Move = self.env["account.move"]
+                Move.flush_model(["partner_payout_sepa_attachment_id"])
+                self.env.cr.execute("""
+                    UPDATE account_move m
+                       SET partner_payout_sepa_attachment_id = x.attachment_id
+                      FROM (SELECT UNNEST(%s::int[]) AS move_id, UNNEST(%s::int[]) AS attachment_id) x
+                     WHERE m.id = x.move_id
+                """, (bill_ids_map, attachment_ids_map))
+                Move.invalidate_model(["partner_payout_sepa_attachment_id"])
+
+            batch.write({
+                "sepa_attachment_ids": [(4, att.id) for att in attachments],
+                "sepa_error": "\n".join(errors) or False,
+            })
+
+        failed = self.filtered("sepa_error")
+        return {
+            "type": "ir.actions.client",
+            "tag": "display_notification",
+            "params": {
+                "title": _("SEPA Files"),
+                "message": _("Some vendor bills were skipped (see SEPA Skipped Bills on the batch).") if failed
+                else _("SEPA credit-transfer files are ready on the batch."),
+                "sticky": bool(failed),
+                "type": "warning" if failed else "success",
+                "next": {"type": "ir.actions.client", "tag": "soft_reload"},
+            },
+        }
@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 import base64
 
-from odoo import api, fields, models, _
+from odoo import api, fields, models, tools, _
 from odoo.exceptions import ValidationError, UserError
 
 try:
@@ -10,6 +10,21 @@ except Exception:
     psycopg2 = None
 
 
+def _normalize_email(email):
+    """Dedupe key for an email: same normalization as mail's email_normalized."""
+    return tools.email_normalize(email) or False
+
+
+def _normalize_phone(env, phone, country=False):
+    """Dedupe key for a phone: E.164, same format as phone_validation's phone_sanitized."""
+    phone = (phone or "").strip()
+    if not phone:
+        return False
+    return env["res.partner"]._phone_format(
+        number=phone, country=country or env.company.country_id, force_format="E164"
+    ) or False
+
+
 class ResPartner(models.Model):
     _inherit = "res.partner"
 
@@ -47,6 +62,15 @@ class ResPartner(models.Model):
     bank_verified = fields.Boolean(default=False, copy=False, tracking=True, store=True, readonly=False)
     bank_verified_on = fields.Datetime(string="Bank Verified On", copy=False, readonly=True)
 
+    # KYC complete/verified, not blocked, bank verified: used in ledger/payout SQL domains
+    payout_eligible = fields.Boolean(
+        string="Payout Eligible",
+        compute="_compute_payout_eligible",
+        store=True,
+        index=True,
+        copy=False,
+    )
+
     company_verified = fields.Boolean(default=False, copy=False, tracking=True, store=True, readonly=False)
     company_verified_on = fields.Datetime(string="Company Verified On", copy=False, readonly=True)
 
@@ -120,6 +144,36 @@ class ResPartner(models.Model):
                 raise ValidationError(_("Commission Rate must be between 0 and 100."))
             ICP.set_param(f"partner_attribution_v1.commission_rate.partner_{rec.id}", str(rate))
 
+    @api.model
+    def _pa_v1_match_contacts(self, contacts):
+        """
+        Resolve a list of (email, phone) pairs to existing partners with one query on the
+        indexed email_normalized / phone_sanitized columns (mail / sms).
+        Email matches win over phone matches; the oldest partner wins on ties.
+        Returns a list of res.partner records (empty recordset when no match), in input order.
+        """
+        keys = [(_normalize_email(email), _normalize_phone(self.env, phone)) for email, phone in contacts]
+        emails = list({e for e, _p in keys if e})
+        phones = list({p for _e, p in keys if p})
+
+        by_email, by_phone = {}, {}
+        if emails or phones:
+            domain = []
+            if emails and phones:
+                domain = ["|", ("email_normalized", "in", emails), ("phone_sanitized", "in", phones)]
+            elif emails:
+                domain = [("email_normalized", "in", emails)]
+            else:
+                domain = [("phone_sanitized", "in", phones)]
+            for partner in self.sudo().search(domain, order="id asc"):
+                if partner.email_normalized:
+                    by_email.setdefault(partner.email_normalized, partner)
+                if partner.phone_sanitized:
+                    by_phone.setdefault(partner.phone_sanitized, partner)
+
+        empty = self.browse()
+        return [by_email.get(e) or by_phone.get(p) or empty for e, p in keys]
+
     # ----------------------------
     # Portal URLs (computed only)
     # ----------------------------
@@ -224,6 +278,33 @@ class ResPartner(models.Model):
             "target": "self",
         }
 
+    @api.depends("kyc_status", "kyc_blocked", "bank_verified")
+    def _compute_payout_eligible(self):
+        for partner in self:
+            partner.payout_eligible = bool(
+                partner.kyc_status in ("complete", "verified")
+                and not partner.kyc_blocked
+                and partner.bank_verified
+            )
+
+    def _auto_init(self):
+        # upgrade path: fill the new column with one UPDATE instead of an ORM recompute over every
+        # partner; on a fresh install the KYC columns do not exist yet and the ORM creates it
+        cr = self.env.cr
+        if not tools.column_exists(cr, "res_partner", "payout_eligible") and all(
+            tools.column_exists(cr, "res_partner", column) for column in ("kyc_status", "kyc_blocked", "bank_verified")
+        ):
+            tools.create_column(cr, "res_partner", "payout_eligible", "boolean")
+            cr.execute("""
+                UPDATE res_partner
+                   SET payout_eligible = (
+                       kyc_status IN ('complete', 'verified')
+                       AND NOT COALESCE(kyc_blocked, FALSE)
+                       AND COALESCE(bank_verified, FALSE)
+                   )
+            """)
+        return super()._auto_init()
+
     # ----------------------------
     # KYC Actions
     # ----------------------------
@@ -234,12 +315,9 @@ class ResPartner(models.Model):
         self.write({"kyc_status": "verified", "kyc_verified_on": fields.Datetime.now(), "kyc_blocked": False})
 
     def action_set_kyc_complete(self):
-        for partner in self:
-            partner.write({
-                "kyc_status": "complete",
-                "kyc_verified_on": partner.kyc_verified_on or fields.Datetime.now(),
-                "kyc_blocked": False,
-            })
+        already = self.filtered("kyc_verified_on")
+        already.write({"kyc_status": "complete", "kyc_blocked": False})
+        (self - already).write({"kyc_status": "complete", "kyc_verified_on": fields.Datetime.now(), "kyc_blocked": False})
 
     def action_set_kyc_rejected(self):
         self.write({"kyc_status": "rejected", "kyc_verified_on": False})
@@ -388,4 +466,10 @@ class ResPartner(models.Model):
         if vals.get("partner_state") == "approved":
             self._ensure_partner_codes()
 
+        if "kyc_status" in vals:
+            # ledger copies are refreshed off-request (set-based SQL in the cron)
+            cron = self.env.ref("partner_attribution_v1.ir_cron_pa_v1_sync_ledger_kyc_status", raise_if_not_found=False)
+            if cron:
+                cron.sudo()._trigger()
+
         return res
\ No newline at end of file
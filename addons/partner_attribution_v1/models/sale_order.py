@@ -2,6 +2,8 @@
 from odoo import api, fields, models, _
 from odoo.exceptions import ValidationError
 
+from .commercial_partner_backfill import _backfill_commercial_partner
+
 try:
     from odoo.http import request
 except Exception:
@@ -24,10 +26,23 @@ class SaleOrder(models.Model):
         domain=[("partner_state", "=", "approved")],
     )
 
+    attributed_commercial_partner_id = fields.Many2one(
+        "res.partner",
+        string="Attributed Commercial Partner",
+        related="attributed_partner_id.commercial_partner_id",
+        store=True,
+        index="btree_not_null",
+        readonly=True,
+    )
+
     attribution_locked = fields.Boolean(string="Attribution Locked", default=False, copy=False)
     attribution_locked_at = fields.Datetime(string="Attribution Locked At", copy=False, readonly=True)
     attribution_locked_by = fields.Many2one("res.users", string="Locked By", copy=False, readonly=True)
 
+    def _auto_init(self):
+        _backfill_commercial_partner(self.env.cr, "sale_order", "attributed_partner_id")
+        return super()._auto_init()
+
     # ----------------------------
     # Helpers
     # ----------------------------
@@ -41,6 +56,16 @@ class SaleOrder(models.Model):
             limit=1,
         )
 
+    def _find_partners_by_codes(self, codes):
+        """Resolve many partner codes with one query. Returns {code: partner} for approved partners."""
+        codes = list({(c or "").strip() for c in codes} - {""})
+        if not codes:
+            return {}
+        partners = self.env["res.partner"].sudo().search(
+            [("partner_code", "in", codes), ("partner_state", "=", "approved")]
+        )
+        return {p.partner_code: p for p in partners}
+
     def _get_referral_code_from_http(self):
         """Read referral code from website session/cookie (if request context exists)."""
         if not request:
@@ -62,23 +87,24 @@ class SaleOrder(models.Model):
             )
             vals["partner_code_input"] = partner.partner_code or False
 
-    def _sync_attributed_partner_from_code(self, vals):
+    def _sync_attributed_partner_from_code(self, vals, partners_by_code=None):
         if "partner_code_input" in vals and "attributed_partner_id" not in vals:
             code = (vals.get("partner_code_input") or "").strip()
             if not code:
                 vals["attributed_partner_id"] = False
                 return
-            partner = self._find_partner_by_code(code)
+            if partners_by_code is None:
+                partners_by_code = self._find_partners_by_codes([code])
+            partner = partners_by_code.get(code)
             vals["attributed_partner_id"] = partner.id if partner else False
 
     # ----------------------------
     # Buttons
     # ----------------------------
     def action_lock_attribution(self):
-        for order in self:
-            if order.attribution_locked:
-                continue
-            order.with_context(bypass_attribution_lock=True).write({
+        to_lock = self.filtered(lambda o: not o.attribution_locked)
+        if to_lock:
+            to_lock.with_context(bypass_attribution_lock=True).write({
                 "attribution_locked": True,
                 "attribution_locked_at": fields.Datetime.now(),
                 "attribution_locked_by": self.env.user.id,
@@ -89,10 +115,9 @@ class SaleOrder(models.Model):
         if not self.env.user.has_group("sales_team.group_sale_manager"):
             raise ValidationError(_("Only Sales Managers can unlock attribution."))
 
-        for order in self:
-            if not order.attribution_locked:
-                continue
-            order.with_context(bypass_attribution_lock=True).write({
+        to_unlock = self.filtered("attribution_locked")
+        if to_unlock:
+            to_unlock.with_context(bypass_attribution_lock=True).write({
                 "attribution_locked": False,
                 "attribution_locked_at": False,
                 "attribution_locked_by": False,
@@ -132,52 +157,69 @@ class SaleOrder(models.Model):
     # ----------------------------
     @api.model_create_multi
     def create(self, vals_list):
-        new_vals_list = []
+        now = fields.Datetime.now()
+        ref_code = None  # read the referral cookie/session at most once per batch
+
+        prepared = []
         for vals in vals_list:
             vals = dict(vals)
 
             # Auto-capture referral code ONLY if user didn't set anything
             auto_from_cookie = False
             if not vals.get("partner_code_input") and not vals.get("attributed_partner_id"):
-                ref_code = (self._get_referral_code_from_http() or "").strip()
+                if ref_code is None:
+                    ref_code = (self._get_referral_code_from_http() or "").strip()
                 if ref_code:
                     vals["partner_code_input"] = ref_code
                     auto_from_cookie = True
 
+            prepared.append((vals, auto_from_cookie))
+
+        # Resolve every partner code of the batch with one query
+        partners_by_code = self._find_partners_by_codes(
+            vals.get("partner_code_input") for vals, _auto in prepared
+            if "partner_code_input" in vals and "attributed_partner_id" not in vals
+        )
+
+        new_vals_list = []
+        for vals, auto_from_cookie in prepared:
             # Sync from code -> partner
-            self._sync_attributed_partner_from_code(vals)
+            self._sync_attributed_partner_from_code(vals, partners_by_code)
 
             # If code was auto from cookie but invalid/unapproved, clear it (prevents garbage codes on SO)
             if auto_from_cookie and vals.get("partner_code_input") and not vals.get("attributed_partner_id"):
                 vals["partner_code_input"] = False
 
+            new_vals_list.append(vals)
+
+        # Prefetch codes of directly set partners in one read
+        direct_ids = {
+            vals["attributed_partner_id"] for vals in new_vals_list
+            if vals.get("attributed_partner_id") and "partner_code_input" not in vals
+        }
+        if direct_ids:
+            self.env["res.partner"].browse(list(direct_ids)).mapped("partner_code")
+
+        for vals in new_vals_list:
             # Sync from partner -> code (if partner was set directly)
             self._sync_code_from_attributed_partner(vals)
 
             if vals.get("attribution_locked"):
-                vals.setdefault("attribution_locked_at", fields.Datetime.now())
+                vals.setdefault("attribution_locked_at", now)
                 vals.setdefault("attribution_locked_by", self.env.user.id)
 
-            new_vals_list.append(vals)
-
         return super().create(new_vals_list)
 
     def write(self, vals):
         if self.env.context.get("skip_partner_code_sync"):
             return super().write(vals)
 
-        # handle multi-write safely without recursion
-        if len(self) > 1 and any(k in vals for k in ("partner_code_input", "attributed_partner_id", "attribution_locked")):
-            ok = True
-            for order in self:
-                ok = ok and bool(order.with_context(skip_partner_code_sync=True).write(vals))
-            return ok
-
+        # vals are the same for every record: check the lock and sync once for the whole set
         vals = dict(vals)
 
-        if self.attribution_locked and not self.env.context.get("bypass_attribution_lock"):
+        if not self.env.context.get("bypass_attribution_lock"):
             blocked = {"partner_code_input", "attributed_partner_id"}
-            if blocked.intersection(vals.keys()):
+            if blocked.intersection(vals.keys()) and any(self.mapped("attribution_locked")):
                 raise ValidationError(_("Attribution is locked. Unlock first to change Partner Code / Attributed Partner."))
 
         if "attribution_locked" in vals:
@@ -196,16 +238,23 @@ class SaleOrder(models.Model):
     # ----------------------------
     # Propagate to Invoice (SO -> Invoice)
     # ----------------------------
+    def _create_invoices(self, grouped=False, final=False, date=None):
+        # one lock timestamp for the whole invoicing batch: the invoices are created locked
+        # in the single create() call, the orders themselves are left as they are
+        self = self.with_context(pa_v1_invoice_lock_at=fields.Datetime.now())
+        return super(SaleOrder, self)._create_invoices(grouped=grouped, final=final, date=date)
+
     def _prepare_invoice(self):
         vals = super()._prepare_invoice()
 
         if self.attributed_partner_id:
             locked_by = self.attribution_locked_by.id if self.attribution_locked_by else self.env.user.id
+            locked_at = self.attribution_locked_at or self.env.context.get("pa_v1_invoice_lock_at") or fields.Datetime.now()
 
             vals.update({
                 "attributed_partner_id": self.attributed_partner_id.id,
                 "attribution_locked": True,
-                "attribution_locked_at": self.attribution_locked_at or fields.Datetime.now(),
+                "attribution_locked_at": locked_at,
                 "attribution_locked_by": locked_by,
             })
 
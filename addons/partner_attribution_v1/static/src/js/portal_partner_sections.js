@@ -0,0 +1,80 @@
+/* Partner portal dashboard: load each section on demand (keyset pagination). */
+(function () {
+    "use strict";
+
+    var COLUMNS = {
+        ledger: ["date", "reference", "type", "state", "amount"],
+        orders: ["date", "reference", "state", "amount"],
+        invoices: ["date", "reference", "state", "amount"],
+        leads: ["date", "reference", "state"],
+        documents: ["date", "reference"],
+    };
+
+    function cell(row, column) {
+        var td = document.createElement("td");
+        if (column === "amount") {
+            td.className = "text-end";
+            td.textContent = (row.currency || "") + " " + Number(row.amount || 0).toFixed(2);
+        } else if (column === "reference" && row.url) {
+            var a = document.createElement("a");
+            a.href = row.url;
+            a.target = "_blank";
+            a.rel = "noopener";
+            a.referrerPolicy = "no-referrer";
+            a.textContent = row.reference;
+            td.appendChild(a);
+        } else {
+            td.textContent = row[column] || "";
+        }
+        return td;
+    }
+
+    function loadPage(section) {
+        var name = section.dataset.section;
+        var url = section.dataset.url + "?limit=" + (section.dataset.limit || 20);
+        if (section.dataset.next) {
+            url += "&after=" + encodeURIComponent(section.dataset.next);
+        }
+        var tbody = section.querySelector("tbody");
+        var more = section.querySelector(".o_pa_v1_more");
+        var empty = section.querySelector(".o_pa_v1_empty");
+        more.disabled = true;
+
+        return fetch(url, { credentials: "same-origin", headers: { Accept: "application/json" } })
+            .then(function (response) { return response.json(); })
+            .then(function (data) {
+                (data.records || []).forEach(function (row) {
+                    var tr = document.createElement("tr");
+                    COLUMNS[name].forEach(function (column) { tr.appendChild(cell(row, column)); });
+                    tbody.appendChild(tr);
+                });
+                section.dataset.next = data.next || "";
+                section.dataset.loaded = "1";
+                more.classList.toggle("d-none", !data.next);
+                empty.classList.toggle("d-none", tbody.children.length > 0);
+            })
+            .finally(function () { more.disabled = false; });
+    }
+
+    function init() {
+        document.querySelectorAll(".o_pa_v1_section").forEach(function (section) {
+            var toggle = section.querySelector(".o_pa_v1_toggle");
+            var body = section.querySelector(".o_pa_v1_body");
+            toggle.addEventListener("click", function () {
+                body.classList.toggle("d-none");
+                if (!section.dataset.loaded && !body.classList.contains("d-none")) {
+                    loadPage(section);
+                }
+            });
+            section.querySelector(".o_pa_v1_more").addEventListener("click", function () {
+                loadPage(section);
+            });
+        });
+    }
+
+    if (document.readyState === "loading") {
+        document.addEventListener("DOMContentLoaded", init);
+    } else {
+        init();
+    }
+})();
@@ -0,0 +1,5 @@
+# -*- coding: utf-8 -*-
+from . import test_attachment_stream
+from . import test_attribution_lock
+from . import test_payout_sepa
+from . import test_sale_invoicing_benchmark
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+
+
+class PartnerAttributionCommon(AccountTestInvoicingCommon):
+
+    @classmethod
+    def setUpClass(cls, chart_template_ref=None):
+        super().setUpClass(chart_template_ref=chart_template_ref)
+        cls.attr_partner = cls.env["res.partner"].create({
+            "name": "Attribution Partner",
+            "partner_role": "ap",
+            "partner_state": "approved",
+            "partner_code": "PA-TEST-001",
+        })
+
+    @classmethod
+    def _create_attributed_invoices(cls, count, attributed_partner=None):
+        return cls.env["account.move"].create([{
+            "move_type": "out_invoice",
+            "partner_id": cls.partner_a.id,
+            "attributed_partner_id": (attributed_partner or cls.attr_partner).id,
+            "invoice_date": "2024-01-01",
+            "invoice_line_ids": [(0, 0, {"name": "Service", "quantity": 1.0, "price_unit": 100.0})],
+        } for _i in range(count)])
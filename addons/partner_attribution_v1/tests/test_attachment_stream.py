@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+import base64
+import io
+
+from odoo.exceptions import UserError
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged("post_install", "-at_install")
+class TestAttachmentStream(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.partner = cls.env["res.partner"].create({"name": "Upload Partner"})
+        cls.Attachment = cls.env["ir.attachment"].sudo()
+
+    def _upload(self, data, max_bytes=10 ** 6):
+        return self.Attachment._pa_v1_create_from_stream(io.BytesIO(data), max_bytes, {
+            "name": "upload.txt",
+            "mimetype": "text/plain",
+            "res_model": "res.partner",
+            "res_id": self.partner.id,
+        })
+
+    def test_streamed_content_is_stored(self):
+        data = b"partner attribution " * 5000
+        attachment = self._upload(data)
+        attachment.invalidate_recordset()
+
+        self.assertEqual(attachment.raw, data)
+        self.assertEqual(base64.b64decode(attachment.datas), data)
+        self.assertEqual(attachment.file_size, len(data))
+        self.assertEqual(attachment.checksum, self.Attachment._compute_checksum(data))
+
+    def test_same_blob_is_reused(self):
+        data = b"same content"
+        self.assertEqual(self._upload(data), self._upload(data))
+
+    def test_limits(self):
+        with self.assertRaises(UserError):
+            self._upload(b"")
+        with self.assertRaises(UserError):
+            self._upload(b"x" * 2048, max_bytes=1024)
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+from odoo.exceptions import ValidationError
+from odoo.tests import tagged
+
+from .common import PartnerAttributionCommon
+
+
+@tagged("post_install", "-at_install")
+class TestAttributionLock(PartnerAttributionCommon):
+
+    def _lock_query_count(self, moves):
+        self.env.flush_all()
+        self.env.invalidate_all()
+        before = self.cr.sql_log_count
+        moves._lock_attribution()
+        self.env.flush_all()
+        return self.cr.sql_log_count - before
+
+    def test_lock_query_count_independent_of_batch_size(self):
+        small = self._create_attributed_invoices(5)
+        large = self._create_attributed_invoices(50)
+
+        expected = self._lock_query_count(small)
+        self.env.invalidate_all()
+        with self.assertQueryCount(expected):
+            large._lock_attribution()
+
+        self.assertTrue(all(large.mapped("attribution_locked")))
+        self.assertEqual(len(set(large.mapped("attribution_locked_at"))), 1)
+        self.assertEqual(large.mapped("attribution_locked_by"), self.env.user)
+
+    def test_lock_requires_attributed_partner(self):
+        move = self._create_attributed_invoices(1)
+        move.attributed_partner_id = False
+        with self.assertRaises(ValidationError):
+            move._lock_attribution()
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+from lxml import etree
+
+from odoo.tests import tagged
+
+from .common import PartnerAttributionCommon
+
+PAIN_NS = {"p": "urn:iso:std:iso:20022:tech:xsd:pain.001.001.03"}
+
+
+@tagged("post_install", "-at_install")
+class TestPayoutSepa(PartnerAttributionCommon):
+
+    @classmethod
+    def setUpClass(cls, chart_template_ref=None):
+        super().setUpClass(chart_template_ref=chart_template_ref)
+        cls.eur = cls.env.ref("base.EUR")
+        cls.eur.active = True
+
+        bank = cls.env["res.bank"].create({"name": "Test Bank", "bic": "ABNANL2A"})
+        cls.company_data["default_journal_bank"].bank_account_id = cls.env["res.partner.bank"].create({
+            "acc_number": "NL91ABNA0417164300",
+            "partner_id": cls.env.company.partner_id.id,
+            "bank_id": bank.id,
+        })
+        cls.env["res.partner.bank"].create({"acc_number": "DE89 3704 0044 0532 0130 00", "partner_id": cls.partner_a.id})
+        cls.env["res.partner.bank"].create({"acc_number": "DE00 1234", "partner_id": cls.partner_b.id})
+
+        cls.batch = cls.env["partner.attribution.payout.batch"].create({"company_id": cls.env.company.id})
+        cls.batch.state = "generated"
+
+    def _create_bill(self, partner, amount):
+        bill = self.env["account.move"].create({
+            "move_type": "in_invoice",
+            "partner_id": partner.id,
+            "currency_id": self.eur.id,
+            "invoice_date": "2024-01-31",
+            "partner_payout_batch_id": self.batch.id,
+            "invoice_line_ids": [(0, 0, {"name": "Commission", "quantity": 1.0, "price_unit": amount})],
+        })
+        bill.action_post()
+        return bill
+
+    def _parse(self, attachment):
+        attachment.invalidate_recordset()
+        return etree.fromstring(attachment.raw)
+
+    def test_pain001_file(self):
+        good = self._create_bill(self.partner_a, 123.45)
+        bad = self._create_bill(self.partner_b, 50.0)
+
+        self.batch.action_generate_sepa_files()
+
+        attachment = self.batch.sepa_attachment_ids
+        self.assertEqual(len(attachment), 1)
+        root = self._parse(attachment)
+        self.assertEqual(root.findtext("p:CstmrCdtTrfInitn/p:GrpHdr/p:NbOfTxs", namespaces=PAIN_NS), "1")
+        self.assertEqual(root.findtext("p:CstmrCdtTrfInitn/p:GrpHdr/p:CtrlSum", namespaces=PAIN_NS), "123.45")
+        self.assertEqual(root.findtext(".//p:DbtrAcct/p:Id/p:IBAN", namespaces=PAIN_NS), "NL91ABNA0417164300")
+        self.assertEqual(root.findtext(".//p:DbtrAgt/p:FinInstnId/p:BIC", namespaces=PAIN_NS), "ABNANL2A")
+
+        transfers = root.findall(".//p:CdtTrfTxInf", namespaces=PAIN_NS)
+        self.assertEqual(len(transfers), 1)
+        self.assertEqual(transfers[0].findtext("p:CdtrAcct/p:Id/p:IBAN", namespaces=PAIN_NS), "DE89370400440532013000")
+        self.assertEqual(transfers[0].findtext("p:Amt/p:InstdAmt", namespaces=PAIN_NS), "123.45")
+        self.assertEqual(transfers[0].findtext("p:PmtId/p:EndToEndId", namespaces=PAIN_NS), good.name)
+
+        self.assertEqual(good.partner_payout_sepa_attachment_id, attachment)
+        self.assertFalse(bad.partner_payout_sepa_attachment_id)
+        self.assertIn(bad.name, self.batch.sepa_error)
+
+        # exported bills are not paid twice
+        self.batch.action_generate_sepa_files()
+        self.assertEqual(self.batch.sepa_attachment_ids, attachment)
+
+    def test_split_by_transaction_count(self):
+        self.env["ir.config_parameter"].sudo().set_param("partner_attribution_v1.sepa_max_transactions", 1)
+        bills = self._create_bill(self.partner_a, 10.0) | self._create_bill(self.partner_a, 20.0)
+
+        self.batch.action_generate_sepa_files()
+
+        attachments = self.batch.sepa_attachment_ids
+        self.assertEqual(len(attachments), 2)
+        self.assertEqual(set(bills.mapped("partner_payout_sepa_attachment_id")), set(attachments))
+        amounts = sorted(
+            self._parse(att).findtext(".//p:CdtTrfTxInf/p:Amt/p:InstdAmt", namespaces=PAIN_NS) for att in attachments
+        )
+        self.assertEqual(amounts, ["10.00", "20.00"])
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+import logging
+import time
+from unittest.mock import patch
+
+from odoo.tests import tagged
+
+from .common import PartnerAttributionCommon
+
+_logger = logging.getLogger(__name__)
+
+BENCHMARK_ORDER_COUNT = 10000
+
+
+@tagged("post_install", "-at_install", "-standard", "pa_v1_benchmark")
+class TestSaleInvoicingBenchmark(PartnerAttributionCommon):
+    """
+    Mass invoicing of attributed sale orders through sale.advance.payment.inv.
+    Not part of the standard run: odoo-bin --test-tags pa_v1_benchmark
+    """
+
+    def test_invoice_10k_orders(self):
+        self.product_a.invoice_policy = "order"
+        orders = self.env["sale.order"].create([{
+            "partner_id": self.partner_a.id,
+            # half attributed by the order, half left to the (single) HTTP referral lookup
+            "attributed_partner_id": self.attr_partner.id if i % 2 == 0 else False,
+            "order_line": [(0, 0, {"product_id": self.product_a.id, "product_uom_qty": 1.0, "price_unit": 100.0})],
+        } for i in range(BENCHMARK_ORDER_COUNT)])
+        orders.action_confirm()
+
+        referral_calls = []
+
+        def _get_referral_code_from_http(move):
+            referral_calls.append(move)
+            return False
+
+        wizard = self.env["sale.advance.payment.inv"].with_context(
+            active_model="sale.order", active_ids=orders.ids,
+        ).create({"advance_payment_method": "delivered", "consolidated_billing": False})
+
+        with patch.object(self.registry["account.move"], "_get_referral_code_from_http", _get_referral_code_from_http):
+            start = time.time()
+            wizard.create_invoices()
+            self.env.flush_all()
+            elapsed = time.time() - start
+
+        _logger.info("partner_attribution_v1: invoiced %s sale orders in %.2fs", len(orders), elapsed)
+
+        invoices = orders.invoice_ids
+        self.assertEqual(len(invoices), BENCHMARK_ORDER_COUNT)
+        self.assertLessEqual(len(referral_calls), 1, "the HTTP referral must be read once per invoicing batch")
+
+        attributed = invoices.filtered("attributed_partner_id")
+        self.assertEqual(len(attributed), BENCHMARK_ORDER_COUNT // 2)
+        self.assertTrue(all(attributed.mapped("attribution_locked")))
+        self.assertEqual(len(set(attributed.mapped("attribution_locked_at"))), 1, "one lock timestamp per batch")
+        self.assertFalse(any(orders.mapped("attribution_locked")), "invoicing must not lock the sale orders")